@@ -0,0 +1,151 @@
+import argparse, gzip, json
+from pathlib import Path
+
+import numpy as np
+
+from src import main as m
+from src.cluster import cluster_embeddings
+
+# ---- Embedding backend agreement ----
+# python -m src.bench.backend_agreement [--fast hashed-tfidf] [--recall 0.99] [--out agreement.json]
+# Scores historical items (full-text items from data/runs/*/extract|stream checkpoints plus the
+# kept items in reports/items-*.json) with the transformer and the fast backend and reports how
+# often their keep/skip decisions agree, the fast keep_threshold that agrees best, the
+# prefilter.threshold for `prefilter.backend: <fast>` (a title + summary score, as Step 2d
+# computes it) that still lets through --recall of the transformer's keeps, and how well the
+# two backends' clusters of the kept items match.
+# Checkpointed items already passed the transformer's prefilter, so the skip side is thinner
+# than in a live run.
+
+def historical_items():
+    """Distinct items with full text, newest first"""
+    out, seen = [], set()
+    def add(items):
+        for it in items:
+            if it.get("text") and it["url"] not in seen:
+                seen.add(it["url"])
+                out.append(it)
+    for run_dir in sorted(m.RUNS_DIR.glob("*"), reverse=True):
+        for stage in ("extract", "stream"):
+            path = m.checkpoint_path(run_dir, stage)
+            if path.exists():
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    add(json.load(f).get("items", []))
+    for path in sorted(m.REPORT_DIR.glob("items-*.json"), reverse=True):
+        add(json.loads(path.read_text(encoding="utf-8")))
+    return out
+
+def scores(backend, texts, weights, batch_size=64):
+    """Item embeddings and score_items scores under one backend (encoded directly, so the
+    embedding store is left alone)"""
+    inc, exc = m.cfg()["intent"]["include"], m.cfg()["intent"]["exclude"]
+    e_inc, e_exc = backend.encode([inc, exc])
+    embs = np.asarray(backend.encode(texts, batch_size=batch_size), dtype=np.float32)
+    return embs, (embs @ e_inc - embs @ e_exc).astype(float) + weights
+
+def confusion(ref, fast):
+    return {"both_keep": int((ref & fast).sum()), "ref_only": int((ref & ~fast).sum()),
+            "fast_only": int((~ref & fast).sum()), "both_skip": int((~ref & ~fast).sum()),
+            "agreement": round(float((ref == fast).mean()), 4) if len(ref) else None}
+
+def rank_corr(a, b):
+    """Spearman correlation (ties broken by order)"""
+    ra, rb = np.argsort(np.argsort(a)), np.argsort(np.argsort(b))
+    return round(float(np.corrcoef(ra, rb)[0, 1]), 4) if len(a) > 1 else None
+
+def best_threshold(ref, fast_scores, long_enough):
+    """Fast keep_threshold whose decisions agree most with ref (None if ref keeps nothing)"""
+    if not ref.any():
+        return None, None
+    cands = np.unique(fast_scores)
+    agree = [float((ref == ((fast_scores >= t) & long_enough)).mean()) for t in cands]
+    return float(cands[int(np.argmax(agree))]), max(agree)
+
+def prefilter_threshold(ref, fast_scores, recall):
+    """Highest fast score threshold that still lets through `recall` of the reference keeps"""
+    keep_scores = np.sort(fast_scores[ref])
+    if not len(keep_scores):
+        return None
+    return float(keep_scores[int(np.floor((1 - recall) * len(keep_scores)))])
+
+def pairs(clusters, n):
+    label = np.empty(n, dtype=int)
+    for c, members in enumerate(clusters):
+        label[members] = c
+    return label[:, None] == label[None, :]
+
+def cluster_agreement(ref_embs, fast_embs, ref_thr, fast_thr, method):
+    """Fraction of item pairs that both backends put together or both keep apart"""
+    n = len(ref_embs)
+    if n < 2:
+        return None
+    a = pairs(cluster_embeddings(ref_embs, sim_thr=ref_thr, method=method), n)
+    b = pairs(cluster_embeddings(fast_embs, sim_thr=fast_thr, method=method), n)
+    upper = np.triu_indices(n, 1)
+    return round(float((a[upper] == b[upper]).mean()), 4)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="keep/skip agreement of a fast embedding backend with the transformer")
+    ap.add_argument("--reference", default="minilm", choices=list(m.BACKENDS))
+    ap.add_argument("--fast", default="hashed-tfidf", choices=list(m.BACKENDS))
+    ap.add_argument("--limit", type=int, default=5000, help="newest items to score")
+    ap.add_argument("--recall", type=float, default=0.99,
+                    help="share of reference keeps a prefilter threshold must let through")
+    ap.add_argument("--out", type=Path, help="also write the results as JSON")
+    args = ap.parse_args(argv)
+
+    items = historical_items()[:args.limit]
+    if not items:
+        raise SystemExit("no historical items with text (data/runs checkpoints or reports/items-*.json)")
+    texts = [f"{it['title']}. {it['text']}" for it in items]
+    weights = np.array([m.history().source_weight(it["domain"]) for it in items], dtype=float)
+    long_enough = np.array([len(it["text"]) > 300 for it in items])
+    # Step 2d scores title + summary, and only for items with at least prefilter.min_chars of it
+    pre_texts = [m.normalize_text(f"{it['title']}. {it.get('summary', '')}") for it in items]
+    judged = np.array([len(t) >= m.cfg().get("prefilter", {}).get("min_chars", 80) for t in pre_texts])
+    print(f"scoring {len(items)} historical items with {args.reference} and {args.fast}")
+    ref, fast = m.build_backend(args.reference), m.build_backend(args.fast)
+    ref_embs, ref_scores = scores(ref, texts, weights)
+    fast_embs, fast_scores = scores(fast, texts, weights)
+    _, fast_pre_scores = scores(fast, pre_texts, weights)
+
+    ref_keep = (ref_scores >= m.keep_threshold(args.reference)) & long_enough
+    fast_thr = m.keep_threshold(args.fast)
+    best_thr, best_agree = best_threshold(ref_keep, fast_scores, long_enough)
+    pre_thr = prefilter_threshold(ref_keep & judged, fast_pre_scores, args.recall)
+    method = m.cfg().get("clustering", {}).get("method", "leader")
+    out = {
+        "items": len(items), "reference": ref.name, "fast": fast.name,
+        "reference_keeps": int(ref_keep.sum()),
+        "score_correlation": {"pearson": round(float(np.corrcoef(ref_scores, fast_scores)[0, 1]), 4) if len(items) > 1 else None,
+                              "spearman": rank_corr(ref_scores, fast_scores)},
+        "at_configured_threshold": {"keep_threshold": fast_thr,
+                                    **confusion(ref_keep, (fast_scores >= fast_thr) & long_enough)},
+        "suggested_keep_threshold": None if best_thr is None else {
+            "keep_threshold": round(best_thr, 4), "agreement": round(best_agree, 4)},
+        "prefilter": None if pre_thr is None else {
+            "backend": args.fast, "threshold": round(pre_thr, 4), "recall": args.recall,
+            "skipped": round(float((judged & (fast_pre_scores < pre_thr)).mean()), 4)},
+        "cluster_pair_agreement": cluster_agreement(ref_embs[ref_keep], fast_embs[ref_keep],
+                                                    m.cluster_threshold(args.reference),
+                                                    m.cluster_threshold(args.fast), method),
+    }
+    c = out["at_configured_threshold"]
+    print(f"  {out['reference_keeps']} of {len(items)} items kept by {args.reference}")
+    print(f"  score correlation: pearson {out['score_correlation']['pearson']}, spearman {out['score_correlation']['spearman']}")
+    print(f"  {args.fast} at keep_threshold {fast_thr}: agreement {c['agreement']:.1%} "
+          f"(both keep {c['both_keep']}, only {args.reference} {c['ref_only']}, "
+          f"only {args.fast} {c['fast_only']}, both skip {c['both_skip']})")
+    if best_thr is not None:
+        print(f"  best-agreeing keep_threshold for {args.fast}: {best_thr:.4f} ({best_agree:.1%})")
+    if pre_thr is not None:
+        print(f"  prefilter: `prefilter.backend: {args.fast}` with `prefilter.threshold: {pre_thr:.4f}` lets through "
+              f"{args.recall:.0%} of {args.reference} keeps and would skip {out['prefilter']['skipped']:.1%} of items")
+    if out["cluster_pair_agreement"] is not None:
+        print(f"  cluster pair agreement on kept items: {out['cluster_pair_agreement']:.1%}")
+    if args.out:
+        args.out.write_text(json.dumps(out, indent=2))
+    return out
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse, time, tracemalloc
+import numpy as np
+
+from src.cluster import cluster_embeddings
+
+# ---- Synthetic clustering benchmark ----
+# python -m src.bench.cluster_bench --sizes 1000 10000 100000
+
+def synthetic_embeddings(n, dim=384, topics=None, noise=0.35, seed=0):
+    """Unit vectors scattered around n/5 random topic centres (roughly MiniLM-shaped)"""
+    rng = np.random.default_rng(seed)
+    topics = topics or max(1, n // 5)
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    pts = centres[rng.integers(0, topics, n)] + noise * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    return pts / np.linalg.norm(pts, axis=1, keepdims=True)
+
+def dense_reference(embs, sim_thr):
+    """The original cluster_items loop over a full n x n matrix"""
+    sim = embs @ embs.T
+    clusters, used = [], set()
+    for i in range(len(embs)):
+        if i in used:
+            continue
+        group = [i]
+        for j in range(i+1, len(embs)):
+            if sim[i,j] >= sim_thr:
+                group.append(j); used.add(j)
+        clusters.append(group); used.add(i)
+    return clusters
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    secs = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return out, secs, peak
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark cluster_embeddings on synthetic data")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--threshold", type=float, default=0.72)
+    ap.add_argument("--block-mb", type=float, default=64)
+    ap.add_argument("--dense-max", type=int, default=5000, help="largest size to also run the dense reference on")
+    args = ap.parse_args()
+
+    print(f"{'n':>8} {'method':>10} {'clusters':>9} {'secs':>8} {'peak MB':>8}")
+    for n in args.sizes:
+        embs = synthetic_embeddings(n)
+        results = {}
+        for method in ("leader", "components"):
+            out, secs, peak = measure(lambda: cluster_embeddings(embs, args.threshold, method, args.block_mb))
+            results[method] = out
+            print(f"{n:>8} {method:>10} {len(out):>9} {secs:>8.2f} {peak:>8.1f}")
+        if n <= args.dense_max:
+            out, secs, peak = measure(lambda: dense_reference(embs, args.threshold))
+            same = "match" if out == results["leader"] else "MISMATCH"
+            print(f"{n:>8} {'dense':>10} {len(out):>9} {secs:>8.2f} {peak:>8.1f}  leader {same}")
+
+if __name__ == "__main__":
+    main()
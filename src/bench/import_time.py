@@ -0,0 +1,35 @@
+import argparse, json, subprocess, sys
+from pathlib import Path
+
+# ---- Import-time budget check ----
+# python -m src.bench.import_time --budget 1.5
+# Fails (exit 1) if importing src.main is slow or pulls in a model/NLP stack eagerly.
+
+ROOT = Path(__file__).resolve().parents[2]
+HEAVY = ("torch", "sentence_transformers", "transformers", "spacy", "trafilatura")
+PROBE = (
+    "import json, sys, time; t = time.perf_counter(); import src.main; "
+    "print(json.dumps({'secs': time.perf_counter() - t, "
+    f"'heavy': sorted(m for m in {HEAVY!r} if m in sys.modules)}}))"
+)
+
+def measure(runs=3):
+    """Best-of-N cold import time of src.main in a fresh interpreter"""
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r["secs"])
+
+def main():
+    ap = argparse.ArgumentParser(description="Check the import-time budget of src.main")
+    ap.add_argument("--budget", type=float, default=1.5, help="seconds")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+    res = measure(args.runs)
+    print(f"import src.main: {res['secs']:.2f}s (budget {args.budget:.2f}s); heavy modules loaded: {res['heavy'] or 'none'}")
+    if res["secs"] > args.budget or res["heavy"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
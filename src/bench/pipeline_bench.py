@@ -0,0 +1,303 @@
+import argparse, copy, hashlib, json, platform, random, re, subprocess, sys, tempfile, threading, time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import yaml
+
+# ---- Offline pipeline benchmark ----
+# python -m src.bench.pipeline_bench --sizes 100 500 2000 [--latency-ms 40 --fail-rate 0.02] [--warm]
+# Serves a corpus (recorded reports/items-*.json topped up with synthetic articles) as RSS feeds
+# and article pages from local HTTP servers, runs src.main against it in a throwaway data
+# directory (one fresh interpreter per run) and reads back reports/metrics-*.json.
+# --save-baseline records the results; later runs are compared against that file.
+
+ROOT = Path(__file__).resolve().parents[2]
+BASELINE_PATH = ROOT / "src" / "bench" / "pipeline_baseline.json"
+VERBS = ["launches", "announces", "expands", "rolls out", "acquires", "partners on", "reports on",
+         "raises funding for", "updates guidance on", "comments on"]
+
+# -- corpus --
+def recorded_articles():
+    """Articles from the kept-item dumps of previous weekly runs"""
+    out = []
+    for path in sorted((ROOT / "reports").glob("items-*.json")):
+        for it in json.loads(path.read_text(encoding="utf-8")):
+            if it.get("text"):
+                out.append({"title": it["title"], "summary": it.get("summary") or it["text"][:300],
+                            "text": it["text"]})
+    return out
+
+def intent_phrases(text):
+    raw = re.split(r"[;,():\n]+", text)
+    return [p.strip(' ."“”').lower() for p in raw if 2 <= len(p.split()) <= 8]
+
+def synthetic_article(rng, include, exclude, vendors):
+    """Vendor/verb/phrase sentences from the intent prompts; the include/exclude mix varies per
+    article so scores spread either side of keep_threshold"""
+    relevance = rng.random()
+    def sentence():
+        phrases = include if rng.random() < relevance else exclude
+        return f"{rng.choice(vendors)} {rng.choice(VERBS)} {rng.choice(phrases)} for {rng.choice(phrases)}."
+    title = sentence().rstrip(".").capitalize()
+    text = " ".join(sentence().capitalize() for _ in range(rng.randint(8, 24)))
+    return {"title": title, "summary": text[:300], "text": text}
+
+def build_corpus(n, seed=0):
+    """n articles: recorded ones first (made unique by index), then synthetic ones"""
+    rng = random.Random(seed)
+    c = yaml.safe_load((ROOT / "config.yaml").read_text())
+    vendors = [d.split(".")[0].capitalize() for d in c["ranking"]["big_vendor_domains"]]
+    recorded = recorded_articles()
+    include, exclude = intent_phrases(c["intent"]["include"]), intent_phrases(c["intent"]["exclude"])
+    now = datetime.now(timezone.utc)
+    corpus = []
+    for i in range(n):
+        art = dict(recorded[i]) if i < len(recorded) else synthetic_article(rng, include, exclude, vendors)
+        art["text"] += f" Reference {i}."
+        art["published"] = now - timedelta(hours=rng.uniform(1, 24 * 6))
+        corpus.append(art)
+    return corpus
+
+# -- fixture server --
+class Fixture:
+    """Feeds /feed/<f>.xml list per_feed articles each; /art/<i> is article i's page"""
+    def __init__(self, corpus, per_feed=20, latency_ms=0.0, jitter_ms=0.0, fail_rate=0.0, seed=0):
+        self.corpus, self.per_feed = corpus, per_feed
+        self.latency_ms, self.jitter_ms, self.fail_rate, self.seed = latency_ms, jitter_ms, fail_rate, seed
+        self.bases = []
+
+    @property
+    def n_feeds(self):
+        return (len(self.corpus) + self.per_feed - 1) // self.per_feed
+
+    def base_for(self, feed):
+        return self.bases[feed % len(self.bases)]
+
+    def feed_urls(self):
+        return [f"{self.base_for(f)}/feed/{f}.xml" for f in range(self.n_feeds)]
+
+    def plan(self, path):
+        """(delay seconds, fail?) for a path; fixed per path so runs are repeatable"""
+        rng = random.Random(int(hashlib.sha1(f"{self.seed}:{path}".encode()).hexdigest()[:12], 16))
+        delay = max(0.0, rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        return delay, rng.random() < self.fail_rate
+
+    def feed_xml(self, f):
+        items = []
+        for i in range(f * self.per_feed, min(len(self.corpus), (f + 1) * self.per_feed)):
+            art = self.corpus[i]
+            items.append(f"<item><title>{escape(art['title'])}</title><link>{self.base_for(f)}/art/{i}</link>"
+                         f"<description>{escape(art['summary'])}</description>"
+                         f"<pubDate>{format_datetime(art['published'])}</pubDate></item>")
+        return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Fixture feed {f}</title>{''.join(items)}</channel></rss>"), "application/rss+xml"
+
+    def article_html(self, i):
+        art = self.corpus[i]
+        paras = "".join(f"<p>{escape(p)}</p>" for p in re.split(r"(?<=[.!?])\s+", art["text"]) if p)
+        return (f"<html><head><title>{escape(art['title'])}</title></head><body><article>"
+                f"<h1>{escape(art['title'])}</h1>{paras}</article></body></html>"), "text/html; charset=utf-8"
+
+    def respond(self, path):
+        m = re.fullmatch(r"/feed/(\d+)\.xml", path) or re.fullmatch(r"/art/(\d+)", path)
+        if not m or int(m.group(1)) >= (self.n_feeds if path.startswith("/feed") else len(self.corpus)):
+            return 404, "", "text/plain"
+        delay, fail = self.plan(path)
+        time.sleep(delay)
+        if fail:
+            return 503, "", "text/plain"
+        body, ctype = (self.feed_xml if path.startswith("/feed") else self.article_html)(int(m.group(1)))
+        return 200, body, ctype
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status, body, ctype = self.server.fixture.respond(self.path)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def serve(fixture, hosts=8):
+    """One server per simulated host (distinct ports count as distinct hosts for per-host limits)"""
+    servers = []
+    for _ in range(hosts):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        srv.daemon_threads = True
+        srv.fixture = fixture
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        fixture.bases.append(f"http://127.0.0.1:{srv.server_address[1]}")
+    return servers
+
+# -- one pipeline run (in a fresh interpreter) --
+def worker(spec_path, argv=()):
+    """Point src.main at the sandbox in spec and run it once (with argv instead of the spec's
+    when given, as for the shard workers of a --shards run)"""
+    spec = json.loads(Path(spec_path).read_text())
+    import tldextract
+    tldextract.extract = tldextract.TLDExtract(suffix_list_urls=())  # bundled suffix list, no network
+    import src.main as m
+    box = Path(spec["sandbox"])
+    (box / "reports").mkdir(parents=True, exist_ok=True)
+    m.REPORT_DIR, m.DATA_DIR, m.RUNS_DIR = box / "reports", box / "data", box / "data" / "runs"
+    m.HIST_PATH, m.LEGACY_HIST_PATH = box / "data" / "history.sqlite", box / "data" / "history.json"
+    m.DISC_PATH, m.DISC_CACHE_PATH = box / "data" / "discovered_sources.yaml", box / "data" / "feed_discovery.json"
+    c = copy.deepcopy(m.cfg())
+    c.setdefault("cache", {})["dir"] = str(box / "data" / "cache")
+    for key, value in spec["overrides"].items():
+        *path, last = key.split(".")
+        node = c
+        for part in path:
+            node = node.setdefault(part, {})
+        node[last] = value
+    srcs = {"rss": spec["feeds"], "domains": [], "pages": [], "discovery": {"expand_from_kept_links": False}}
+    m.cfg, m.sources = (lambda: c), (lambda: srcs)
+    m.SHARD_COMMAND = [sys.executable, "-u", "-m", "src.bench.pipeline_bench", "--worker", str(spec_path)]
+    m.main(list(argv) or spec["argv"])
+
+def run_once(box, feeds, argv, label, overrides=None):
+    spec = box / f"{label}.json"
+    spec.write_text(json.dumps({"sandbox": str(box), "feeds": feeds, "argv": argv, "overrides": overrides or {}}))
+    t0 = time.perf_counter()
+    with (box / f"{label}.log").open("w") as log:
+        proc = subprocess.run([sys.executable, "-m", "src.bench.pipeline_bench", "--worker", str(spec)],
+                              cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - t0
+    if proc.returncode:
+        tail = (box / f"{label}.log").read_text().splitlines()[-20:]
+        raise SystemExit("pipeline run failed:\n" + "\n".join(tail))
+    metrics = json.loads(sorted((box / "reports").glob("metrics-*.json"))[-1].read_text())
+    kept = json.loads(sorted((box / "reports").glob("items-*.json"))[-1].read_text())
+    return {
+        "wall": round(wall, 3),
+        "seconds": metrics["seconds"],
+        "stages": {k: v["seconds"] for k, v in metrics["stages"].items()},
+        "helpers": {k: v["seconds"] for k, v in metrics["helpers"].items()},
+        "peak_rss_mb": metrics["peak_rss_mb"],
+        "requests": metrics["http"]["requests"],
+        "kept": len(kept),
+    }
+
+def bench(args):
+    overrides = dict(parse_override(kv) for kv in args.set)
+    settings = {k: getattr(args, k) for k in ("hosts", "per_feed", "latency_ms", "jitter_ms", "fail_rate",
+                                              "seed", "stream", "warm")}
+    settings["overrides"] = overrides
+    if args.shards:
+        settings["shards"] = args.shards
+    results = {}
+    for n in args.sizes:
+        fixture = Fixture(build_corpus(n, args.seed), args.per_feed, args.latency_ms, args.jitter_ms,
+                          args.fail_rate, args.seed)
+        servers = serve(fixture, args.hosts)
+        argv = ["--no-checkpoint"] + (["--stream"] if args.stream else []) \
+            + (["--shards", str(args.shards)] if args.shards else [])
+        try:
+            with tempfile.TemporaryDirectory(prefix="fms-bench-") as tmp:
+                box = Path(tmp)
+                results[str(n)] = {"cold": run_once(box, fixture.feed_urls(), argv, "cold", overrides)}
+                if args.warm:
+                    results[str(n)]["warm"] = run_once(box, fixture.feed_urls(), argv, "warm", overrides)
+        finally:
+            for srv in servers:
+                srv.shutdown()
+                srv.server_close()
+    return {"commit": git_commit(), "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "machine": platform.machine(),
+            "settings": settings, "results": results}
+
+def parse_override(kv):
+    """'clustering.method=components' -> ('clustering.method', 'components'); values are YAML"""
+    key, sep, value = kv.partition("=")
+    if not sep:
+        raise SystemExit(f"--set expects key=value, got {kv!r}")
+    return key, yaml.safe_load(value)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+# -- reporting --
+def print_table(data, baseline=None):
+    stages = list(dict.fromkeys(s for r in data["results"].values() for p in r.values() for s in p["stages"]))
+    print(f"{'n':>6} {'pass':>5} {'kept':>5} {'total':>8} " + " ".join(f"{s:>9}" for s in stages) + f" {'RSS MB':>7}")
+    for n, passes in data["results"].items():
+        for name, p in passes.items():
+            print(f"{n:>6} {name:>5} {p['kept']:>5} {p['seconds']:>8.2f} "
+                  + " ".join(f"{p['stages'].get(s, 0):>9.2f}" for s in stages) + f" {p['peak_rss_mb'] or 0:>7.0f}")
+            base = (baseline or {}).get("results", {}).get(n, {}).get(name)
+            if base:
+                print(f"{'':>6} {'Δ':>5} {p['kept'] - base['kept']:>+5} {pct(p['seconds'], base['seconds']):>8} "
+                      + " ".join(f"{pct(p['stages'].get(s, 0), base['stages'].get(s, 0)):>9}" for s in stages))
+
+def pct(new, old):
+    return f"{(new - old) / old:+.0%}" if old else "n/a"
+
+def regressions(data, baseline, tolerance):
+    """(size, pass, new, old) where total stage time grew by more than tolerance"""
+    out = []
+    for n, passes in data["results"].items():
+        for name, p in passes.items():
+            base = baseline.get("results", {}).get(n, {}).get(name)
+            if base and base["seconds"] and p["seconds"] > base["seconds"] * (1 + tolerance):
+                out.append((n, name, p["seconds"], base["seconds"]))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Time src.main stages against a local fixture corpus", allow_abbrev=False)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000], help="articles in the corpus")
+    ap.add_argument("--hosts", type=int, default=8, help="simulated hosts (local servers)")
+    ap.add_argument("--per-feed", type=int, default=20, help="articles per feed")
+    ap.add_argument("--latency-ms", type=float, default=40.0, help="mean response delay")
+    ap.add_argument("--jitter-ms", type=float, default=20.0, help="std dev of the response delay")
+    ap.add_argument("--fail-rate", type=float, default=0.02, help="fraction of URLs answering 503")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--stream", action="store_true", help="run the pipeline with --stream")
+    ap.add_argument("--shards", type=int, help="run the pipeline with --shards N")
+    ap.add_argument("--warm", action="store_true", help="rerun each size on the same data dir (warm caches)")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="config.yaml override for the runs, e.g. clustering.method=components")
+    ap.add_argument("--out", type=Path, help="also write the results JSON here")
+    ap.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="results to compare against")
+    ap.add_argument("--save-baseline", action="store_true", help="write these results to --baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline before exit 1")
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args, rest = ap.parse_known_args()
+    if args.worker:
+        return worker(args.worker, rest)
+    if rest:
+        ap.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    data = bench(args)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() and not args.save_baseline else None
+    if baseline and baseline.get("settings") != data["settings"]:
+        print(f"baseline {args.baseline} was recorded with different settings; not comparing")
+        baseline = None
+    print_table(data, baseline)
+    if args.out:
+        args.out.write_text(json.dumps(data, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(data, indent=2))
+        print(f"saved baseline to {args.baseline}")
+    elif baseline:
+        slow = regressions(data, baseline, args.tolerance)
+        for n, name, new, old in slow:
+            print(f"REGRESSION n={n} {name}: {new:.2f}s vs {old:.2f}s at {baseline.get('commit')}")
+        if slow:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import json, re, hashlib, threading
+from pathlib import Path
+from datetime import datetime, date, timedelta
+
+import numpy as np
+
+# ---- Content-addressed article text cache ----
+# index.json maps canonical URL -> {hash, fetched, used, size}; the text itself lives in
+# <hash[:2]>/<hash>.txt so syndicated copies with identical text share one blob.
+
+def content_hash(text):
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+class ArticleCache:
+    def __init__(self, root: Path, max_mb=200):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.index = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        self.hits = self.misses = 0
+        self._changed = set()
+        self._lock = threading.Lock()
+
+    def _blob(self, h):
+        return self.root / h[:2] / f"{h}.txt"
+
+    def get(self, url):
+        """Cached entry {text, hash, fetched, ...extra fields from put()} for url, or None"""
+        with self._lock:
+            meta = self.index.get(url)
+            blob = self._blob(meta["hash"]) if meta else None
+            if not blob or not blob.exists():
+                self.misses += 1
+                return None
+            self.hits += 1
+            meta["used"] = datetime.utcnow().isoformat()
+            self._changed.add(url)
+        return {**meta, "text": blob.read_text(encoding="utf-8")}
+
+    def put(self, url, text, **extra):
+        h = content_hash(text)
+        blob = self._blob(h)
+        with self._lock:
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                blob.write_text(text, encoding="utf-8")
+            now = datetime.utcnow().isoformat()
+            self.index[url] = {"hash": h, "fetched": now, "used": now, "size": len(text.encode("utf-8")), **extra}
+            self._changed.add(url)
+        return h
+
+    def changes(self):
+        """Index entries read or written since this cache was opened (blobs are already on disk)"""
+        with self._lock:
+            return {url: dict(self.index[url]) for url in self._changed if url in self.index}
+
+    def merge(self, entries):
+        """Take index entries from changes() of another process's cache"""
+        with self._lock:
+            self.index.update(entries)
+            self._changed.update(entries)
+
+    def evict(self):
+        """Drop least recently used URLs until the unique blobs fit in max_bytes"""
+        with self._lock:
+            by_hash = {}
+            for url, m in self.index.items():
+                by_hash.setdefault(m["hash"], []).append(url)
+            total = sum(self.index[urls[0]]["size"] for urls in by_hash.values())
+            removed = 0
+            for url, m in sorted(self.index.items(), key=lambda kv: kv[1]["used"]):
+                if total <= self.max_bytes:
+                    break
+                del self.index[url]
+                removed += 1
+                urls = by_hash[m["hash"]]
+                urls.remove(url)
+                if not urls:
+                    total -= m["size"]
+                    self._blob(m["hash"]).unlink(missing_ok=True)
+            return removed
+
+    def save(self):
+        self.evict()
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.index_path.write_text(json.dumps(self.index, sort_keys=True))
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate), {len(self.index)} cached URLs"
+
+# ---- Embedding store ----
+# <model>.f32 is a flat float32 matrix (one row per distinct text) read through np.memmap;
+# <model>.json maps sha1(text) -> [row, last used date]. Either file missing or out of
+# sync just means a cold cache, so the directory is safe to drop from the Actions cache.
+
+class EmbeddingStore:
+    def __init__(self, root: Path, model_name, max_age_days=90):
+        self.root = Path(root)
+        safe = re.sub(r"[^\w.-]+", "_", model_name)
+        self.rows_path = self.root / f"{safe}.f32"
+        self.index_path = self.root / f"{safe}.json"
+        self.model_name = model_name
+        self.max_age_days = max_age_days
+        idx = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        self.dim = idx.get("dim")
+        self.index = idx.get("rows", {})
+        on_disk = self.rows_path.stat().st_size if self.rows_path.exists() else 0
+        if not self.dim or on_disk != len(self.index) * self.dim * 4:
+            self.dim, self.index = None, {}
+        self.new = {}
+        self.hits = self.misses = 0
+        self._mm = None
+        self._lock = threading.Lock()
+
+    def _matrix(self):
+        if self._mm is None and self.index:
+            self._mm = np.memmap(self.rows_path, dtype=np.float32, mode="r", shape=(len(self.index), self.dim))
+        return self._mm
+
+    def _row(self, key):
+        if key in self.new:
+            return self.new[key]
+        return np.asarray(self._matrix()[self.index[key][0]])
+
+    def encode(self, texts, encode_fn):
+        """Embeddings for texts, calling encode_fn only for texts never seen before"""
+        keys = [content_hash(t) for t in texts]
+        today = date.today().isoformat()
+        with self._lock:
+            todo = {k: t for k, t in zip(keys, texts) if k not in self.index and k not in self.new}
+            self.misses += len(todo)
+            self.hits += len(keys) - len(todo)
+        if todo:
+            vecs = np.asarray(encode_fn(list(todo.values())), dtype=np.float32)
+            with self._lock:
+                self.dim = self.dim or vecs.shape[1]
+                self.new.update(zip(todo.keys(), vecs))
+        with self._lock:
+            for k in keys:
+                if k in self.index:
+                    self.index[k][1] = today
+            return np.stack([self._row(k) for k in keys]) if keys else np.zeros((0, self.dim or 0), np.float32)
+
+    def changes(self):
+        """(keys, rows) encoded since this store was opened and not saved yet"""
+        with self._lock:
+            keys = list(self.new)
+            return keys, np.stack([self.new[k] for k in keys]) if keys else np.zeros((0, self.dim or 0), np.float32)
+
+    def merge(self, keys, rows):
+        """Take rows from changes() of another process's store"""
+        with self._lock:
+            for k, v in zip(keys, rows):
+                if k not in self.index and k not in self.new:
+                    self.dim = self.dim or len(v)
+                    self.new[k] = np.asarray(v, dtype=np.float32)
+
+    def save(self):
+        """Append new rows, dropping rows unused for max_age_days (rewrites the matrix)"""
+        cutoff = (date.today() - timedelta(days=self.max_age_days)).isoformat()
+        with self._lock:
+            stale = [k for k, (_, used) in self.index.items() if used < cutoff]
+            if not self.new and not stale:
+                return 0
+            self.root.mkdir(parents=True, exist_ok=True)
+            if stale:
+                keep = sorted((row, k) for k, (row, used) in self.index.items() if used >= cutoff)
+                mat = self._matrix()
+                tmp = self.rows_path.with_suffix(".tmp")
+                with tmp.open("wb") as f:
+                    for row, _ in keep:
+                        f.write(np.asarray(mat[row], dtype=np.float32).tobytes())
+                self._mm = mat = None
+                tmp.replace(self.rows_path)
+                self.index = {k: [i, self.index[k][1]] for i, (_, k) in enumerate(keep)}
+            today = date.today().isoformat()
+            with self.rows_path.open("ab") as f:
+                for k, v in self.new.items():
+                    self.index[k] = [len(self.index), today]
+                    f.write(np.asarray(v, dtype=np.float32).tobytes())
+            self.new, self._mm = {}, None
+            self.index_path.write_text(json.dumps({"model": self.model_name, "dim": self.dim, "rows": self.index}))
+            return len(stale)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} encoded ({rate:.0%} reuse), {len(self.index) + len(self.new)} stored"
+
+# ---- Small JSON key/value cache ----
+# For derived values that are cheap to store but expensive to recompute (e.g. spaCy terms).
+# Entries not read or written for max_age_days are dropped on save.
+
+class KeyValueCache:
+    def __init__(self, path: Path, max_age_days=90):
+        self.path = Path(path)
+        self.max_age_days = max_age_days
+        self.data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["used"] = date.today().isoformat()
+            return entry["value"]
+
+    def put(self, key, value):
+        with self._lock:
+            self.data[key] = {"value": value, "used": date.today().isoformat()}
+
+    def save(self):
+        cutoff = (date.today() - timedelta(days=self.max_age_days)).isoformat()
+        with self._lock:
+            self.data = {k: v for k, v in self.data.items() if v["used"] >= cutoff}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.data, sort_keys=True))
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
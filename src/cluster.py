@@ -0,0 +1,73 @@
+import numpy as np
+
+# ---- Blocked similarity clustering ----
+# Both methods walk the similarity matrix one block of rows at a time, so peak memory is
+# block_rows x n instead of n x n. Embeddings are assumed unit-normalised (embed() does
+# this), which makes cosine similarity a plain dot product.
+
+def _block_rows(n, block_mb):
+    return max(1, min(n, int(block_mb * 1024 * 1024 // (4 * max(1, n)))))
+
+def _normalise(embs):
+    embs = np.asarray(embs, dtype=np.float32)
+    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+    return embs / np.where(norms == 0, 1, norms)
+
+def leader_clusters(embs, sim_thr=0.72, block_mb=64):
+    """Greedy leader clustering with the same output as the original dense loop:
+    each unused item in order leads a group of every later item with sim >= sim_thr."""
+    embs = _normalise(embs)
+    n = len(embs)
+    used = np.zeros(n, dtype=bool)
+    clusters = []
+    step = _block_rows(n, block_mb)
+    for start in range(0, n, step):
+        stop = min(n, start + step)
+        if used[start:stop].all():
+            continue
+        sims = embs[start:stop] @ embs[start:].T
+        for i in range(start, stop):
+            if used[i]:
+                continue
+            js = np.nonzero(sims[i - start, i - start + 1:] >= sim_thr)[0] + i + 1
+            clusters.append([i] + js.tolist())
+            used[i] = True
+            used[js] = True
+    return clusters
+
+def component_clusters(embs, sim_thr=0.72, block_mb=64):
+    """Connected components of the sim >= sim_thr graph (single linkage) via union-find.
+    Every item lands in exactly one cluster; clusters are ordered by their first member."""
+    embs = _normalise(embs)
+    n = len(embs)
+    parent = np.arange(n)
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    step = _block_rows(n, block_mb)
+    for start in range(0, n, step):
+        stop = min(n, start + step)
+        sims = embs[start:stop] @ embs[start:].T
+        rows, cols = np.nonzero(sims >= sim_thr)
+        for r, c in zip(rows + start, cols + start):
+            if c > r:
+                a, b = find(r), find(c)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return sorted(groups.values(), key=lambda g: g[0])
+
+METHODS = {"leader": leader_clusters, "components": component_clusters}
+
+def cluster_embeddings(embs, sim_thr=0.72, method="leader", block_mb=64):
+    if len(embs) == 0:
+        return []
+    return METHODS[method](embs, sim_thr=sim_thr, block_mb=block_mb)
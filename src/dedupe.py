@@ -0,0 +1,59 @@
+import hashlib, re
+
+import numpy as np
+
+# ---- Near-duplicate grouping (SimHash) ----
+# Syndicated copies of one press release differ only in boilerplate, so their 64-bit SimHash
+# fingerprints are a few bits apart. Fingerprints within max_distance bits agree exactly on at
+# least one of max_distance + 1 bands (pigeonhole), so candidates come from band buckets and
+# only those are compared bit by bit. Entries of one feed often share a long boilerplate
+# description ("The post ... appeared first on ...", a channel blurb), so texts from the same
+# source are never grouped: syndication is across feeds.
+
+WORD = re.compile(r"\w+")
+_BITS = np.arange(64, dtype=np.uint64)
+
+def shingles(text, k=3):
+    words = WORD.findall((text or "").lower())
+    return [" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))] if words else []
+
+def simhash(text, k=3):
+    """64-bit SimHash over word k-shingles, or None for empty text"""
+    feats = shingles(text, k)
+    if not feats:
+        return None
+    hs = np.array([int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+                   for f in feats], dtype=np.uint64)
+    ones = ((hs[:, None] >> _BITS) & np.uint64(1)).sum(axis=0)
+    return sum(1 << int(b) for b in np.nonzero(ones * 2 > len(feats))[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class NearDuplicates:
+    """Incremental grouping: add(text, obj, source) returns the representative (first obj added)
+    of an earlier near-duplicate of text from another source (any, if source is None), or None
+    when text starts a new group"""
+    def __init__(self, max_distance=3, min_words=8):
+        self.max_distance, self.min_words = max_distance, min_words
+        edges = np.linspace(0, 64, max_distance + 2).astype(int)
+        self.bands = list(zip(edges[:-1], edges[1:]))
+        self.buckets = [{} for _ in self.bands]
+        self.groups = 0
+
+    def _keys(self, h):
+        return [(h >> int(lo)) & ((1 << int(hi - lo)) - 1) for lo, hi in self.bands]
+
+    def add(self, text, obj, source=None):
+        if len(WORD.findall(text or "")) < self.min_words:
+            return None
+        h = simhash(text)
+        keys = self._keys(h)
+        for bucket, key in zip(self.buckets, keys):
+            for other, rep, src in bucket.get(key, ()):
+                if hamming(h, other) <= self.max_distance and (source is None or src != source):
+                    return rep
+        for bucket, key in zip(self.buckets, keys):
+            bucket.setdefault(key, []).append((h, obj, source))
+        self.groups += 1
+        return None
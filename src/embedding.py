@@ -0,0 +1,88 @@
+import json, math, re, zlib
+from pathlib import Path
+
+import numpy as np
+
+from src.cache import content_hash
+
+# ---- Embedding backends ----
+# embed() in src.main encodes through one of these (config.yaml `embedding.backend`). Every
+# backend returns unit-normalised float32 rows, so scoring and clustering stay dot products,
+# and has a `name` that keys its rows in the EmbeddingStore.
+
+class MiniLMBackend:
+    """sentence-transformers model (the default); loaded on first encode"""
+    def __init__(self, model="all-MiniLM-L6-v2"):
+        self.name = model
+        self._model = None
+
+    def encode(self, texts, batch_size=32):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            print(f"  loading embedding model {self.name}")
+            self._model = SentenceTransformer(self.name)
+        return self._model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9&+-]*")
+
+class HashedTfidfBackend:
+    """Signed feature hashing of word unigrams + bigrams into `dim` buckets, sublinear tf
+    times an idf fitted on past kept items. No model download and ~1 ms per article on CPU;
+    scores run on a different scale from MiniLM (see src.bench.backend_agreement)."""
+    def __init__(self, dim=2048, idf_path=None, fit_paths=(), max_chars=5000):
+        """idf_path: saved fit (.npy), loaded if present, else fitted on the fit_paths item
+        files (JSON lists with title/text) and saved there, so the fit and the store rows keyed
+        by it stay put from week to week. Delete it to refit."""
+        self.dim, self.max_chars = dim, max_chars
+        self._buckets = {}
+        self.idf = np.ones(dim, dtype=np.float32)
+        if idf_path and Path(idf_path).exists():
+            self.idf = np.load(idf_path)
+        else:
+            docs = [f"{it['title']}. {it.get('text', '')}" for path in sorted(fit_paths)
+                    for it in json.loads(Path(path).read_text(encoding="utf-8"))]
+            if docs:
+                print(f"  fitting hashed tf-idf ({dim} dims) on {len(docs)} archived items")
+                self.fit(docs)
+                if idf_path:
+                    Path(idf_path).parent.mkdir(parents=True, exist_ok=True)
+                    np.save(idf_path, self.idf)
+        self.name = f"hashed-tfidf-{dim}-{content_hash(self.idf.tobytes().hex())[:8]}"
+
+    def _features(self, text):
+        words = TOKEN.findall((text or "")[:self.max_chars].lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _bucket(self, feature):
+        b = self._buckets.get(feature)
+        if b is None:
+            h = zlib.crc32(feature.encode("utf-8"))
+            b = self._buckets[feature] = (h % self.dim, 1.0 if h >> 31 else -1.0)
+        return b
+
+    def fit(self, docs):
+        df = np.zeros(self.dim, dtype=np.float64)
+        for doc in docs:
+            df[list({self._bucket(f)[0] for f in self._features(doc)})] += 1
+        self.idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+
+    def encode(self, texts, batch_size=32):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tf = {}
+            for f in self._features(text):
+                tf[f] = tf.get(f, 0) + 1
+            for f, n in tf.items():
+                i, sign = self._bucket(f)
+                out[row, i] += sign * (1 + math.log(n))
+        out *= self.idf
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+BACKENDS = {"minilm": MiniLMBackend, "hashed-tfidf": HashedTfidfBackend}
+
+def make_backend(name, **options):
+    """Backend called name, built with its config.yaml options (`embedding.<name>`)"""
+    if name not in BACKENDS:
+        raise ValueError(f"unknown embedding backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](**options)
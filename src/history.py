@@ -0,0 +1,186 @@
+import json, sqlite3, statistics, threading
+from pathlib import Path
+from datetime import date, timedelta
+
+# ---- Trend & source history (SQLite) ----
+# Replaces data/history.json: term series are rows indexed by (term, date), so Step 8 only
+# reads the terms it saw this week and nothing is parsed at import time. The legacy JSON is
+# imported once, the first time an empty database is opened next to it. The feeds table holds
+# per-feed polling stats for the scheduler in src.main (stage_feeds); the items table holds the
+# kept items of daily ingest runs (--ingest) that a weekly --report run is built from.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS term_counts (
+    term TEXT NOT NULL,
+    date TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sources INTEGER NOT NULL,
+    PRIMARY KEY (term, date)
+);
+CREATE INDEX IF NOT EXISTS term_counts_date ON term_counts(date);
+CREATE TABLE IF NOT EXISTS sources (
+    domain TEXT PRIMARY KEY,
+    weight REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feeds (
+    url TEXT PRIMARY KEY,
+    polls INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,       -- entries returned, summed over polls
+    new_entries INTEGER NOT NULL DEFAULT 0,   -- entries newer than anything seen before
+    kept INTEGER NOT NULL DEFAULT 0,          -- items kept in reports, summed over runs
+    first_polled TEXT,
+    last_polled TEXT,
+    last_new TEXT,                            -- publish date of the newest entry seen
+    last_kept TEXT,
+    error_streak INTEGER NOT NULL DEFAULT 0,  -- consecutive failed polls
+    latencies TEXT NOT NULL DEFAULT '[]'      -- seconds per poll, most recent FEED_LATENCIES
+);
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,   -- canonical URL
+    day TEXT NOT NULL,      -- date the item was first kept
+    item TEXT NOT NULL      -- the kept item as JSON (title, url, summary, score, ...; no text)
+);
+CREATE INDEX IF NOT EXISTS items_day ON items(day);
+"""
+
+FEED_LATENCIES = 10
+
+class HistoryStore:
+    def __init__(self, path: Path, legacy_json: Path = None):
+        self.path = Path(path)
+        self.legacy_json = legacy_json
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+        return self._conn
+
+    def _migrate(self):
+        if not self.legacy_json or not Path(self.legacy_json).exists():
+            return
+        if self._conn.execute("SELECT 1 FROM term_counts LIMIT 1").fetchone() or \
+           self._conn.execute("SELECT 1 FROM sources LIMIT 1").fetchone():
+            return
+        legacy = json.loads(Path(self.legacy_json).read_text())
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO term_counts VALUES (?, ?, ?, ?)",
+            [(t, x["date"], int(x["count"]), int(x["sources"]))
+             for t, series in legacy.get("terms", {}).items() for x in series])
+        self._conn.executemany("INSERT OR REPLACE INTO sources VALUES (?, ?)",
+                               [(d, float(w)) for d, w in legacy.get("sources", {}).items()])
+        self._conn.commit()
+        print(f"  migrated {self.legacy_json} → {self.path}")
+
+    # -- terms --
+    def series(self, term, limit=None):
+        """[{date, count, sources}] for term, oldest first (the last `limit` entries)"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT date, count, sources FROM term_counts WHERE term = ? ORDER BY date DESC LIMIT ?",
+                (term, -1 if limit is None else limit)).fetchall()
+        return [{"date": d, "count": c, "sources": s} for d, c, s in reversed(rows)]
+
+    def record_term(self, term, day, count, sources):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO term_counts VALUES (?, ?, ?, ?)",
+                              (term, day, int(count), int(sources)))
+
+    def prune(self, window_weeks, today=None):
+        """Drop rows older than window_weeks and keep at most window_weeks rows per term"""
+        cutoff = ((today or date.today()) - timedelta(weeks=window_weeks)).isoformat()
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM term_counts WHERE date < ?", (cutoff,))
+            removed = cur.rowcount
+            cur = self.conn.execute("""
+                DELETE FROM term_counts WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (PARTITION BY term ORDER BY date DESC) AS rn
+                        FROM term_counts)
+                    WHERE rn > ?)""", (window_weeks,))
+            return removed + cur.rowcount
+
+    # -- domain reputation --
+    def source_weight(self, dom, default=0.0):
+        with self._lock:
+            row = self.conn.execute("SELECT weight FROM sources WHERE domain = ?", (dom,)).fetchone()
+        return row[0] if row else default
+
+    def set_source_weight(self, dom, weight):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (dom, float(weight)))
+
+    # -- feed polling stats --
+    def _feed_row(self, row):
+        cols = ("url", "polls", "entries", "new_entries", "kept", "first_polled", "last_polled",
+                "last_new", "last_kept", "error_streak", "latencies")
+        st = dict(zip(cols, row))
+        lat = json.loads(st.pop("latencies"))
+        st["median_latency"] = round(statistics.median(lat), 3) if lat else None
+        return st
+
+    def feed_stats(self, url=None):
+        """Stats dict for url (None if never polled), or {url: stats} for every feed"""
+        with self._lock:
+            if url is not None:
+                row = self.conn.execute("SELECT * FROM feeds WHERE url = ?", (url,)).fetchone()
+                return self._feed_row(row) if row else None
+            return {r[0]: self._feed_row(r) for r in self.conn.execute("SELECT * FROM feeds")}
+
+    def record_feed_poll(self, url, day, ok, entries=0, new_entries=0, newest=None, seconds=None):
+        with self._lock:
+            row = self.conn.execute("SELECT last_new, latencies FROM feeds WHERE url = ?", (url,)).fetchone()
+            last_new, lat = (row[0], json.loads(row[1])) if row else (None, [])
+            if seconds is not None:
+                lat = (lat + [round(seconds, 3)])[-FEED_LATENCIES:]
+            if newest and (not last_new or newest > last_new):
+                last_new = newest
+            self.conn.execute("""
+                INSERT INTO feeds (url, polls, entries, new_entries, first_polled, last_polled, last_new,
+                                   error_streak, latencies)
+                VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    polls = polls + 1, entries = entries + excluded.entries,
+                    new_entries = new_entries + excluded.new_entries, last_polled = excluded.last_polled,
+                    last_new = excluded.last_new,
+                    error_streak = CASE WHEN ? THEN 0 ELSE error_streak + 1 END,
+                    latencies = excluded.latencies""",
+                (url, entries, new_entries, day, day, last_new, 0 if ok else 1, json.dumps(lat), ok))
+
+    def record_feed_kept(self, url, day, kept):
+        with self._lock:
+            self.conn.execute("UPDATE feeds SET kept = kept + ?, last_kept = ? WHERE url = ?", (kept, day, url))
+
+    # -- kept items (daily ingest) --
+    def add_items(self, items, day):
+        """Store kept items under their `key`; an item kept again keeps its first day and gets
+        the newer copy. Returns how many were new."""
+        with self._lock:
+            known = {k for (k,) in self.conn.execute("SELECT key FROM items")}
+            self.conn.executemany("""
+                INSERT INTO items VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET item = excluded.item""",
+                [(it["key"], day, json.dumps(it, ensure_ascii=False)) for it in items])
+        return len({it["key"] for it in items} - known)
+
+    def items_since(self, day):
+        """Items first kept on or after day, in the order they were stored"""
+        with self._lock:
+            rows = self.conn.execute("SELECT item FROM items WHERE day >= ? ORDER BY day, rowid", (day,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def prune_items(self, before):
+        """Drop items first kept before the given day"""
+        with self._lock:
+            return self.conn.execute("DELETE FROM items WHERE day < ?", (before,)).rowcount
+
+    def save(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.execute("VACUUM")
@@ -0,0 +1,64 @@
+import functools, re
+from urllib.parse import urlparse
+
+# ---- Keyword matching ----
+# Every keyword list (ranking words, section cues) goes into one case-insensitive regex, so a
+# text is scanned once and scan() reports each category with the offset of its first hit.
+# Keywords only match whole words; categories listed in `plurals` also accept a trailing
+# s/es. A keyword that contains another one (e.g. "ai-powered" and "ai") reports both
+# categories, since the regex only returns the longest match at each position.
+
+class KeywordMatcher:
+    def __init__(self, categories, plurals=(), cache_size=4096):
+        """categories: {name: [keywords]}; plurals: category names that also match plural forms"""
+        self.plurals = set(plurals)
+        self.table = {}
+        for cat, words in categories.items():
+            for w in words:
+                key = self._key(w)
+                if key:
+                    self.table.setdefault(key, set()).add(cat)
+        # a keyword also counts for every keyword found inside it
+        for key in self.table:
+            for other, cats in list(self.table.items()):
+                if other != key and re.search(rf"(?<!\w){re.escape(other)}(?!\w)", key):
+                    self.table[key] = self.table[key] | cats
+        body = _trie_pattern(self.table) if self.table else r"(?!)"
+        self.regex = re.compile(rf"(?<!\w)({body})(e?s)?(?!\w)", re.I)
+        self.scan = functools.lru_cache(maxsize=cache_size)(self._scan)
+
+    @staticmethod
+    def _key(text):
+        return " ".join((text or "").lower().split())
+
+    def _scan(self, text):
+        """{category: offset of its first hit in text} (cached per distinct text)"""
+        hits = {}
+        for m in self.regex.finditer(text):
+            for cat in self.table.get(self._key(m.group(1)), ()):
+                if m.group(2) and cat not in self.plurals:
+                    continue
+                hits.setdefault(cat, m.start())
+        return hits
+
+def _trie_pattern(words):
+    """Regex alternation of words factored into a prefix trie (longest match first), which
+    re steps through far faster than one flat alternative per word"""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    def emit(node):
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+    return emit(trie)
+
+def host_matches(url, domains):
+    """True if url's host is one of domains or a subdomain of one"""
+    host = urlparse(url).netloc.lower().split(":")[0]
+    return any(host == d or host.endswith("." + d) for d in domains)
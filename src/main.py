@@ -1,36 +1,172 @@
-import os, json, yaml, csv, re, socket
+import os, sys, json, yaml, csv, re, socket, threading, time, functools, gzip, shutil, argparse, queue, subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlunparse
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import feedparser, requests, tldextract
+import feedparser, tldextract
 from bs4 import BeautifulSoup
-import trafilatura
 
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer, util
 from dateutil import parser as dtparser, tz
-import spacy
+
+from src.cache import ArticleCache, EmbeddingStore, KeyValueCache, content_hash
+from src.cluster import cluster_embeddings
+from src.dedupe import NearDuplicates
+from src.embedding import BACKENDS, make_backend
+from src.history import HistoryStore
+from src.keywords import KeywordMatcher, host_matches
+from src import metrics, net
 
 # ---- Global socket timeout ----
 socket.setdefaulttimeout(int(os.getenv("HTTP_TIMEOUT", "20")))
 
-# ---- Paths & Config ----
+# ---- Paths ----
 ROOT = Path(__file__).resolve().parents[1]
-CFG = yaml.safe_load((ROOT / "config.yaml").read_text())
-SRC = yaml.safe_load((ROOT / "sources.yaml").read_text())
-HIST_PATH = ROOT / "data" / "history.json"
+HIST_PATH = ROOT / "data" / "history.sqlite"
+LEGACY_HIST_PATH = ROOT / "data" / "history.json"
 DISC_PATH = ROOT / "data" / "discovered_sources.yaml"
+DISC_CACHE_PATH = ROOT / "data" / "feed_discovery.json"
 REPORT_DIR = ROOT / "reports"; REPORT_DIR.mkdir(parents=True, exist_ok=True)
 DATA_DIR = ROOT / "data"; DATA_DIR.mkdir(parents=True, exist_ok=True)
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# ---- Lazy state ----
+# Config, data files, caches and the models load on first use, so importing a helper
+# (summarize, bucket, ...) stays cheap and runs that never embed never load the model.
+_LAZY_LOCK = threading.RLock()
+
+def lazy(fn):
+    """Build fn() once on first call (thread-safe) and return the same object afterwards"""
+    value = []
+    @functools.wraps(fn)
+    def get():
+        if not value:
+            with _LAZY_LOCK:
+                if not value:
+                    value.append(fn())
+        return value[0]
+    return get
+
+@lazy
+def cfg():
+    return yaml.safe_load((ROOT / "config.yaml").read_text())
+
+@lazy
+def sources():
+    return yaml.safe_load((ROOT / "sources.yaml").read_text())
+
+@lazy
+def cache_dir():
+    return ROOT / cfg().get("cache", {}).get("dir", "data/cache")
+
+@lazy
+def history():
+    return HistoryStore(HIST_PATH, legacy_json=LEGACY_HIST_PATH)
+
+@lazy
+def disc():
+    return yaml.safe_load(DISC_PATH.read_text()) if DISC_PATH.exists() else {"feeds": {}, "pending": {}}
+
+@lazy
+def disc_cache():
+    return json.loads(DISC_CACHE_PATH.read_text()) if DISC_CACHE_PATH.exists() else {}
+
+def validators_path():
+    """ETag / Last-Modified and the 304 replay payload per URL; a cache (not committed), since
+    losing it only costs one full fetch per URL"""
+    return cache_dir() / "http_validators.json"
+
+@lazy
+def validators():
+    return json.loads(validators_path().read_text()) if validators_path().exists() else {}
+
+@lazy
+def feed_checks():
+    return KeyValueCache(cache_dir() / "feed_checks.json", max_age_days=90)
+
+@lazy
+def articles():
+    return ArticleCache(cache_dir() / "articles", max_mb=cfg().get("cache", {}).get("articles_max_mb", 200))
+
+@lazy
+def terms_cache():
+    return KeyValueCache(cache_dir() / "terms.json", max_age_days=cfg().get("cache", {}).get("terms_max_age_days", 90))
+
+@lazy
+def seen_index():
+    return KeyValueCache(cache_dir() / "seen.json", max_age_days=cfg().get("seen", {}).get("max_age_days", 60))
+
+@lazy
+def http_client():
+    net.configure(**cfg().get("http", {}))
+    return net
 
-HIST = json.loads(HIST_PATH.read_text()) if HIST_PATH.exists() else {"terms": {}, "sources": {}}
-DISC = yaml.safe_load(DISC_PATH.read_text()) if DISC_PATH.exists() else {"feeds": {}, "pending": {}}
+# ---- Models ----
+def backend_name():
+    return cfg().get("embedding", {}).get("backend", "minilm")
 
-# ---- Embeddings model ----
-MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+def backend_cfg(name=None):
+    """Options of an embedding backend (config.yaml `embedding.<name>`), default the selected one"""
+    return cfg().get("embedding", {}).get(name or backend_name()) or {}
+
+def build_backend(name):
+    opts = {k: v for k, v in backend_cfg(name).items() if k not in ("keep_threshold", "margin", "cluster_threshold")}
+    if name == "minilm":
+        opts.setdefault("model", MODEL_NAME)
+    elif name == "hashed-tfidf":
+        dim = opts.setdefault("dim", 2048)
+        opts.update(idf_path=cache_dir() / f"tfidf-idf-{dim}.npy", fit_paths=REPORT_DIR.glob("items-*.json"))
+    return make_backend(name, **opts)
+
+@lazy
+def backend():
+    return build_backend(backend_name())
+
+@lazy
+def embeddings():
+    return EmbeddingStore(cache_dir() / "embeddings", backend().name,
+                          max_age_days=cfg().get("cache", {}).get("embeddings_max_age_days", 90))
+
+def prefilter_backend_name():
+    """Backend of the Step 2d title + summary scores (prefilter.backend, default the scoring one)"""
+    return cfg().get("prefilter", {}).get("backend") or backend_name()
+
+@lazy
+def prefilter_backend():
+    name = prefilter_backend_name()
+    return backend() if name == backend_name() else build_backend(name)
+
+@lazy
+def prefilter_embeddings():
+    if prefilter_backend_name() == backend_name():
+        return embeddings()
+    return EmbeddingStore(cache_dir() / "embeddings", prefilter_backend().name,
+                          max_age_days=cfg().get("cache", {}).get("embeddings_max_age_days", 90))
+
+def save_embeddings():
+    embeddings().save()
+    if prefilter_backend_name() != backend_name():
+        prefilter_embeddings().save()
+
+@lazy
+def nlp():
+    import spacy
+    print("  loading spaCy en_core_web_sm")
+    pipeline = spacy.load("en_core_web_sm", disable=["lemmatizer","textcat","tagger"])
+    pipeline.max_length = 2_000_000
+    return pipeline
+
+@lazy
+def nlp_tag():
+    """name-version of the spaCy model, read from the installed package so that a term cache
+    lookup never loads the model (nlp() only if the package metadata is missing)"""
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return f"core_web_sm-{version('en_core_web_sm')}"
+    except PackageNotFoundError:
+        return f"{nlp().meta.get('name')}-{nlp().meta.get('version')}"
 
 # ---- Basic helpers ----
 def normalize_text(s):
@@ -43,6 +179,26 @@ def domain(u):
     except:
         return urlparse(u).netloc
 
+def compile_any(patterns):
+    """One regex matching any of patterns; a leading inline flag like (?i) becomes a scoped group"""
+    parts = []
+    for pat in patterns:
+        m = re.match(r"^\(\?([aiLmsux]+)\)", pat)
+        parts.append(f"(?{m.group(1)}:{pat[m.end():]})" if m else f"(?:{pat})")
+    return re.compile("|".join(parts) if parts else r"(?!)")
+
+TRACKING_PARAM = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_hsenc|_hsmi|mkt_tok|igshid|ref|ref_src)$", re.I)
+
+def canonical_url(u):
+    """Identity of an article URL (cache and seen-index key): http and https, www. and default
+    ports, trailing slashes, fragments and tracking params don't matter; other params are sorted"""
+    p = urlparse((u or "").strip())
+    scheme = "https" if p.scheme.lower() in ("http", "https") else p.scheme.lower()
+    host = re.sub(r":(80|443)$", "", p.netloc.lower())
+    host = host[4:] if host.startswith("www.") else host
+    query = "&".join(sorted(q for q in p.query.split("&") if q and not TRACKING_PARAM.match(q.split("=")[0])))
+    return urlunparse((scheme, host, p.path.rstrip("/") or "/", p.params, query, ""))
+
 def is_recent(published_str, days=7, tzname="Europe/London"):
     try:
         dt = dtparser.parse(published_str)
@@ -54,66 +210,290 @@ def is_recent(published_str, days=7, tzname="Europe/London"):
         dt = dt.replace(tzinfo=tzinfo)
     return (now - dt) <= timedelta(days=days)
 
-def requests_get(url, timeout=12):
-    headers = {"User-Agent": "Mozilla/5.0 (FMS-Intent-Tracker)"}
-    return requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+def requests_get(url, timeout=12, headers=None):
+    return http_client().get(url, timeout=timeout, headers=headers)
+
+def parse_feed_response(res):
+    return feedparser.parse(res.content, response_headers={k.lower(): v for k, v in res.headers.items()})
+
+# ---- Conditional GET ----
+HTTP_STATS = {"200": 0, "304": 0, "error": 0, "bytes_saved": 0, "seconds_saved": 0.0}
+_HTTP_STATS_LOCK = threading.Lock()
+# Fetches not sent because the time budget ran out or the host's circuit was open:
+# {"feeds" | "pages" | "articles" | "discovery": {"budget" | "breaker": count}}
+SKIPS = {}
+TRIPPED = set()  # hosts with an open circuit in earlier stages (restored from checkpoints)
+
+def count_skip(kind, err):
+    reason = "budget" if isinstance(err, net.BudgetExhausted) else "breaker"
+    with _HTTP_STATS_LOCK:
+        SKIPS.setdefault(kind, {}).setdefault(reason, 0)
+        SKIPS[kind][reason] += 1
+
+def degraded():
+    """Skip counts and tripped hosts of this run so far (empty when nothing was skipped)"""
+    with _HTTP_STATS_LOCK:
+        skips = {k: dict(v) for k, v in SKIPS.items()}
+    return {"skips": skips, "hosts": sorted(TRIPPED | set(net.tripped()))}
+
+def restore_degraded(d):
+    """Add skip counts and hosts from a checkpoint or shard worker"""
+    with _HTTP_STATS_LOCK:
+        for kind, by in d.get("skips", {}).items():
+            for reason, n in by.items():
+                SKIPS.setdefault(kind, {}).setdefault(reason, 0)
+                SKIPS[kind][reason] += n
+        TRIPPED.update(d.get("hosts", []))
+
+def http_counts():
+    """Copy of the conditional GET counters (200 / 304 / error, bytes and seconds saved)"""
+    with _HTTP_STATS_LOCK:
+        return {**HTTP_STATS, "seconds_saved": round(HTTP_STATS["seconds_saved"], 3)}
+
+def restore_http_counts(d):
+    """Add conditional GET counters from a shard worker"""
+    with _HTTP_STATS_LOCK:
+        for k, n in d.items():
+            HTTP_STATS[k] += n
+
+def http_counts_line():
+    c = http_counts()
+    return (f"HTTP: {c['200']} full, {c['304']} not modified, {c['error']} errors "
+            f"(saved ~{c['bytes_saved'] // 1024} KB, {c['seconds_saved']:.1f}s)")
+
+def replayed(url):
+    """Copy of the entries or links stored with url's validators (returned on a 304)"""
+    return [dict(e) for e in validators_for(url).get("replay", [])]
+
+def validators_for(url):
+    """Stored ETag / Last-Modified for url (empty when conditional GET is off)"""
+    if not cfg().get("fetch", {}).get("conditional", True):
+        return {}
+    return validators().get(url, {})
+
+def conditional_headers(url):
+    v = validators_for(url)
+    headers = {}
+    if "replay" not in v:
+        return headers  # nothing to answer a 304 with
+
+    if v.get("etag"):
+        headers["If-None-Match"] = v["etag"]
+    if v.get("modified"):
+        headers["If-Modified-Since"] = v["modified"]
+    return headers
+
+def record_fetch(url, status, etag=None, modified=None, nbytes=0, seconds=0.0, replay=None):
+    """Count a fetch outcome; full responses refresh the stored validators and `replay`, what
+    the response parsed to, which a later 304 for url returns instead"""
+    with _HTTP_STATS_LOCK:
+        if status == 304:
+            prev = validators().get(url, {})
+            HTTP_STATS["304"] += 1
+            HTTP_STATS["bytes_saved"] += prev.get("bytes", 0)
+            HTTP_STATS["seconds_saved"] += max(0.0, prev.get("seconds", 0.0) - seconds)
+        elif status and 200 <= status < 300:
+            HTTP_STATS["200"] += 1
+            if etag or modified:
+                validators()[url] = {"etag": etag, "modified": modified, "bytes": int(nbytes),
+                                     "seconds": round(seconds, 3), "replay": replay or []}
+            else:
+                validators().pop(url, None)
+        else:
+            HTTP_STATS["error"] += 1
 
 # ---- Finder ----
+FEED_TYPES = ("rss", "atom")
+
+def feed_links_from_html(html):
+    """Absolute <link rel="alternate"> RSS/Atom hrefs from a page's <head>"""
+    if not html:
+        return []
+    head = html[:html.lower().find("</head>") + 7] if "</head>" in html.lower() else html
+    soup = BeautifulSoup(head, "html.parser")
+    links = []
+    for link in soup.find_all("link", {"rel": "alternate"}):
+        if any(t in (link.get("type") or "") for t in FEED_TYPES):
+            href = link.get("href")
+            if href and href.startswith("http") and href not in links:
+                links.append(href)
+    return links
+
+def validate_feed(url, ttl_days=30, force=False):
+    """True if url parses as a feed with entries; verdicts are remembered across runs for
+    ttl_days (force: probe again regardless)"""
+    cached = None if force else feed_checks().get(url)
+    if cached and datetime.utcnow() - datetime.fromisoformat(cached["checked"]) < timedelta(days=ttl_days):
+        return cached["ok"]
+    try:
+        res = requests_get(url)
+        fp = parse_feed_response(res) if res.ok else None
+        ok = fp is not None and fp.bozo == 0 and bool(fp.entries)
+    except net.Skipped:
+        raise  # not probed, so no verdict to remember
+    except Exception:
+        ok = False
+    feed_checks().put(url, {"ok": ok, "checked": datetime.utcnow().isoformat()})
+    return ok
+
 COMMON_FEED_PATHS = ["/feed", "/rss", "/rss.xml", "/atom.xml", "/news/rss", "/blog/rss", "/press/rss", "/changelog.xml"]
 
-def discover_feeds_for_domain(dom):
+def discover_feeds_for_domain(dom, ttl_days=7, force=False):
+    """Up to 3 feeds found for dom, or None if probing was cut short (budget or open circuit).
+    Feed verdicts older than ttl_days (the domain's own TTL) are probed again; force: all are"""
     found = set()
     try:
         # 1) Try common paths
         for p in COMMON_FEED_PATHS:
-            try:
-                url = f"https://{dom}{p}"
-                fp = feedparser.parse(url)
-                if fp.bozo == 0 and fp.entries:
-                    found.add(url)
-            except Exception:
-                pass
+            url = f"https://{dom}{p}"
+            if validate_feed(url, ttl_days, force):
+                found.add(url)
         # 2) Parse homepage for <link rel="alternate">
         try:
             res = requests_get(f"https://{dom}")
             if res.ok:
-                soup = BeautifulSoup(res.text, "html.parser")
-                for link in soup.find_all("link", {"rel": "alternate"}):
-                    if "rss" in (link.get("type") or "") or "atom" in (link.get("type") or ""):
-                        href = link.get("href")
-                        if href and href.startswith("http"):
-                            fp = feedparser.parse(href)
-                            if fp.bozo == 0 and fp.entries:
-                                found.add(href)
+                for href in feed_links_from_html(res.text):
+                    if validate_feed(href, ttl_days, force):
+                        found.add(href)
+        except net.Skipped:
+            raise
         except Exception:
             pass
+    except net.Skipped as e:
+        count_skip("discovery", e)
+        return None
     except Exception:
         pass
-    return list(found)[:3]
+    return sorted(found)[:3]
+
+def discovery_expired(dom, ttl_days=28, negative_ttl_days=7):
+    """True if the cached probe result for dom is missing or older than its TTL"""
+    entry = disc_cache().get(dom)
+    if not entry:
+        return True
+    try:
+        checked = datetime.fromisoformat(entry["checked"])
+    except Exception:
+        return True
+    ttl = ttl_days if entry.get("feeds") else negative_ttl_days
+    return datetime.utcnow() - checked > timedelta(days=ttl)
 
 # ---- Feed fetch ----
+@metrics.timed("fetch_feed", items=lambda args, out: len(out))
 def fetch_feed(url):
+    t0 = time.perf_counter()
     try:
-        feed = feedparser.parse(url)
-        count = len(feed.entries)
-        print(f"     [feed] {url} → {count} entries")
-        for e in feed.entries:
-            yield {
-                "title": e.get("title") or "",
-                "url": e.get("link") or "",
-                "summary": BeautifulSoup(e.get("summary",""), "html.parser").get_text()[:1000],
-                "published": e.get("published") or e.get("updated") or "",
-                "feed": url
-            }
+        res = requests_get(url, headers=conditional_headers(url))
+        if res.status_code == 304:
+            elapsed = time.perf_counter() - t0
+            record_fetch(url, 304, seconds=elapsed)
+            record_feed_poll(url, True, seconds=elapsed)
+            entries = replayed(url)
+            print(f"     [feed] {url} → not modified, {len(entries)} stored entries ({elapsed:.2f}s)")
+            return entries
+        if not res.ok:
+            raise IOError(f"HTTP {res.status_code}")
+        feed = parse_feed_response(res)
+        entries = [{
+            "title": e.get("title") or "",
+            "url": e.get("link") or "",
+            "summary": BeautifulSoup(e.get("summary",""), "html.parser").get_text()[:1000],
+            "published": e.get("published") or e.get("updated") or "",
+            "feed": url
+        } for e in feed.entries]
+        elapsed = time.perf_counter() - t0
+        # only entries a rerun inside the lookback window could still use are stored
+        recent = [e for e in entries if is_recent(e["published"], days=cfg()["lookback_days"], tzname=cfg()["timezone"])]
+        record_fetch(url, res.status_code, res.headers.get("ETag"), res.headers.get("Last-Modified"),
+                     len(res.content), elapsed, replay=recent)
+        record_feed_poll(url, True, entries, elapsed)
+        print(f"     [feed] {url} → {len(entries)} entries ({elapsed:.2f}s)")
+        return entries
+    except net.Skipped as e:
+        # not a failed poll: the feed keeps its schedule and stats
+        count_skip("feeds", e)
+        print(f"     [feed SKIPPED] {url} → {e}")
+        return []
     except Exception as e:
-        print(f"     [feed ERROR] {url} → {e}")
+        record_fetch(url, None)
+        record_feed_poll(url, False, seconds=time.perf_counter() - t0)
+        print(f"     [feed ERROR] {url} → {e} ({time.perf_counter() - t0:.2f}s)")
         return []
+
+# ---- Feed schedule ----
+# Feeds whose items were kept lately are polled every run. Feeds with entries but nothing kept
+# within kept_window_days are polled every low_yield_days, feeds with no new entries for
+# dead_after_days every dead_days, and feeds failing park_after_errors polls in a row are
+# parked and retried every parked_retry_days. New feeds are polled every run until they
+# have min_polls polls of history. POLL_ALL_FEEDS=1 ignores the schedule.
+def published_date(s):
+    try:
+        return dtparser.parse(s).date().isoformat()
+    except Exception:
+        return None
+
+def record_feed_poll(url, ok, entries=(), seconds=None):
+    """Feed stats for the schedule: entries returned, how many are newer than any seen before"""
+    prev = (history().feed_stats(url) or {}).get("last_new")
+    dates = [d for d in (published_date(e["published"]) for e in entries) if d]
+    new = sum(1 for d in dates if not prev or d > prev)
+    poll = [url, datetime.utcnow().date().isoformat(), ok, len(entries), new, max(dates, default=None), seconds]
+    if SHARD_JOURNAL is not None:
+        SHARD_JOURNAL["feed_polls"].append(poll)
+        return
+    history().record_feed_poll(*poll)
+
+def feed_due(st, today, sch):
+    """(poll this run?, why not) for a feed with history().feed_stats() st"""
+    if not st or st["polls"] < sch.get("min_polls", 4):
+        return True, None
+    age = lambda d: (today - datetime.fromisoformat(d).date()).days if d else None
+    if st["error_streak"] >= sch.get("park_after_errors", 4):
+        every, reason = sch.get("parked_retry_days", 28), f"parked after {st['error_streak']} failed polls"
+    elif st["last_kept"] and age(st["last_kept"]) <= sch.get("kept_window_days", 56):
+        return True, None  # kept lately, even if its entries carry no dates (last_new unset)
+    elif not st["last_new"] or age(st["last_new"]) > sch.get("dead_after_days", 60):
+        every, reason = sch.get("dead_days", 28), f"no new entries since {st['last_new'] or 'ever'}"
+    else:
+        every, reason = sch.get("low_yield_days", 14), f"nothing kept since {st['last_kept'] or 'ever'}"
+    if age(st["last_polled"]) >= every:
+        return True, None
+    nxt = (datetime.fromisoformat(st["last_polled"]).date() + timedelta(days=every)).isoformat()
+    return False, f"{reason}; polled every {every} days, next on {nxt}"
+
+# ---- Concurrent fetching ----
+_HOST_SLOTS = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+def host_slot(url, per_host):
+    """Semaphore capping simultaneous requests to one host"""
+    host = net.host(url)
+    with _HOST_SLOTS_LOCK:
+        if host not in _HOST_SLOTS:
+            _HOST_SLOTS[host] = threading.BoundedSemaphore(max(1, per_host))
+        return _HOST_SLOTS[host]
+
+def fetch_concurrently(fn, urls, workers=16, per_host=2):
+    """Run fn(url) over urls in a thread pool; results come back in input order"""
+    ordered = list(dict.fromkeys(urls))
+    def run(u):
+        with host_slot(u, per_host):
+            return fn(u)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(zip(ordered, pool.map(run, ordered)))
+
 # ---- Page crawler ----
 def extract_links_from_page(page_url, max_links=30):
+    t0 = time.perf_counter()
     try:
-        res = requests_get(page_url)
+        res = requests_get(page_url, headers=conditional_headers(page_url))
+        if res.status_code == 304:
+            record_fetch(page_url, 304, seconds=time.perf_counter() - t0)
+            return replayed(page_url)
         if not res.ok:
+            record_fetch(page_url, res.status_code)
             return []
+        nbytes, seconds = len(res.content), time.perf_counter() - t0
         soup = BeautifulSoup(res.text, "html.parser")
         links = []
         base_dom = domain(page_url)
@@ -136,48 +516,137 @@ def extract_links_from_page(page_url, max_links=30):
             links.append({"title": text, "url": href, "summary": "", "published": ""})
             if len(links) >= max_links:
                 break
+        record_fetch(page_url, res.status_code, res.headers.get("ETag"), res.headers.get("Last-Modified"),
+                     nbytes, seconds, replay=links)
         return links
+    except net.Skipped as e:
+        count_skip("pages", e)
+        return []
     except Exception:
+        record_fetch(page_url, None)
         return []
 
 # ---- Reader ----
+@metrics.timed("extract_main")
 def extract_main(url, fallback=""):
-    try:
-        downloaded = trafilatura.fetch_url(url, timeout=12)
-        text = trafilatura.extract(downloaded, include_comments=False, include_tables=False) or ""
-        text = normalize_text(text)
-        if len(text) < 400:
-            text = normalize_text(fallback)
-        return text
-    except Exception:
-        return normalize_text(fallback)
+    """(main text, feed links from the page head); both are cached per canonical URL.
+    Raises if the page could not be fetched or parsed, or was not requested (net.Skipped)."""
+    import trafilatura
+    key = canonical_url(url)
+    cached = articles().get(key)
+    if cached is not None and "feeds" in cached:
+        text, feeds = cached["text"], cached["feeds"]
+    else:
+        try:
+            res = requests_get(url, timeout=12)
+            if not res.ok:
+                raise IOError(f"HTTP {res.status_code}")
+            downloaded = res.content
+            text, feeds = "", []
+            if downloaded:
+                text = trafilatura.extract(downloaded, include_comments=False, include_tables=False) or ""
+                text = normalize_text(text)
+                feeds = feed_links_from_html(res.text)
+        except net.Skipped as e:
+            count_skip("articles", e)
+            raise
+        if downloaded:
+            articles().put(key, text, feeds=feeds)
+    if len(text) < 400:
+        text = normalize_text(fallback)
+    return text, feeds
 
-def embed(texts):
-    return MODEL.encode(texts, normalize_embeddings=True)
+@metrics.timed("embed", items=lambda args, out: len(out))
+def embed(texts, batch_size=32, pre=False):
+    """Unit-normalised embeddings; each distinct text is encoded at most once (see embeddings()).
+    pre: with the pre-filter's backend"""
+    store, model = (prefilter_embeddings(), prefilter_backend()) if pre else (embeddings(), backend())
+    return store.encode(texts, lambda todo: model.encode(todo, batch_size=batch_size))
 
 # ---- Intent scoring ----
+_INTENT_EMBS = {}
+
+def intent_embeddings(inc, exc, pre=False):
+    """Include/exclude prompt embeddings, encoded once per run (and backend)"""
+    if (inc, exc, pre) not in _INTENT_EMBS:
+        _INTENT_EMBS[(inc, exc, pre)] = embed([inc, exc], pre=pre)
+    return _INTENT_EMBS[(inc, exc, pre)]
+
+def score_items(texts, inc, exc, source_weights=None, batch_size=64, pre=False):
+    """Batched score_item: cos(item, include) - cos(item, exclude) + source weight
+    (pre: on the pre-filter's backend)"""
+    if not texts:
+        return np.zeros(0)
+    e_inc, e_exc = intent_embeddings(inc, exc, pre)
+    embs = embed(texts, batch_size=batch_size, pre=pre)
+    sw = np.zeros(len(texts)) if source_weights is None else np.asarray(source_weights, dtype=float)
+    # Embeddings are unit-normalised, so cosine similarity is a plain dot product. Row-wise
+    # sums rather than a BLAS matvec keep each score independent of the batch it came in,
+    # so streamed, sharded and stage-by-stage runs agree to the last bit.
+    return ((embs * e_inc).sum(axis=1) - (embs * e_exc).sum(axis=1)).astype(float) + sw
+
 def score_item(text, inc, exc, source_weight=0.0):
-    e_item, e_inc, e_exc = embed([text, inc, exc])
-    return float(util.cos_sim(e_item, e_inc) - util.cos_sim(e_item, e_exc) + source_weight)
+    return float(score_items([text], inc, exc, [source_weight])[0])
+
+# Scores and similarities are on a different scale per backend, so each backend may carry its
+# own thresholds; the scoring/prefilter/clustering values are the MiniLM ones.
+def keep_threshold(name=None):
+    return backend_cfg(name).get("keep_threshold", cfg()["scoring"]["keep_threshold"])
+
+def prefilter_margin(name=None):
+    return backend_cfg(name).get("margin", cfg().get("prefilter", {}).get("margin", 0.10))
+
+def cluster_threshold(name=None):
+    return backend_cfg(name).get("cluster_threshold", cfg().get("clustering", {}).get("threshold", 0.72))
+
+def prefilter_cutoff():
+    """Title + summary score below which Step 2d skips an item: keep_threshold - margin, or
+    prefilter.threshold when prefilter.backend is another backend (its own score scale)"""
+    if prefilter_backend_name() == backend_name():
+        return keep_threshold() - prefilter_margin()
+    threshold = cfg().get("prefilter", {}).get("threshold")
+    if threshold is None:
+        raise ValueError(f"prefilter.backend {prefilter_backend_name()} needs prefilter.threshold "
+                         f"(see python -m src.bench.backend_agreement)")
+    return threshold
+
+# ---- Pre-filter ----
+def prefilter_items(items, inc, exc, cutoff, hard_filter, min_chars=80, batch_size=64):
+    """Drop items that cannot plausibly be kept before paying for a full-text fetch:
+    hard filters on title + summary + URL, then a title + summary intent score (on the
+    pre-filter's backend) below cutoff."""
+    passed, hard = [], 0
+    for it in items:
+        if hard_filter.search(f"{it['title']}. {it['summary']} {it['url']}"):
+            print(f"  FILTERED (pre) {it['domain']:20} | title={it['title'][:60]}")
+            remember(it, "hard")
+            hard += 1
+            continue
+        passed.append(it)
+    # Page links often carry nothing but a short title; only judge items with enough text.
+    # Items fully scored in an earlier run (seen_base) already passed this check then.
+    quick = [it for it in passed if "seen_base" not in it and len(f"{it['title']}. {it['summary']}") >= min_chars]
+    weights = [history().source_weight(it["domain"]) for it in quick]
+    scores = score_items([normalize_text(f"{it['title']}. {it['summary']}") for it in quick], inc, exc,
+                         weights, batch_size=batch_size, pre=True)
+    low = set()
+    for it, s, sw in zip(quick, scores, weights):
+        if s < cutoff:
+            print(f"  PRE-SKIPPED {it['domain']:20} | quick={s:.3f} | title={it['title'][:60]}")
+            remember(it, "pre", base=float(s) - sw)
+            low.add(id(it))
+    survivors = [it for it in passed if id(it) not in low]
+    return survivors, {"hard": hard, "low": len(low)}
 
 # ---- Clustering ----
-def cluster_items(items, sim_thr=0.72):
-    texts = [f"{it['title']}. {it['text'][:2000]}" for it in items]
+@metrics.timed("cluster_items", items=lambda args, out: len(args[0]))
+def cluster_items(items, sim_thr=0.72, method="leader", block_mb=64):
+    # Same text as Step 4 scoring so the embedding comes straight from the store. MiniLM
+    # truncates at 256 tokens, well inside the 2000 chars previously used here.
+    texts = [f"{it['title']}. {it['text']}" for it in items]
     if not texts:
         return []
-    embs = embed(texts)
-    sim = cosine_similarity(embs)
-    clusters, used = [], set()
-    n = len(items)
-    for i in range(n):
-        if i in used:
-            continue
-        group = [i]
-        for j in range(i+1, n):
-            if sim[i,j] >= sim_thr:
-                group.append(j); used.add(j)
-        clusters.append(group); used.add(i)
-    return clusters
+    return cluster_embeddings(embed(texts), sim_thr=sim_thr, method=method, block_mb=block_mb)
 
 # ---- Summarization ----
 def summarize(text, sentences=3):
@@ -189,14 +658,12 @@ def summarize(text, sentences=3):
     return " ".join(parts[:sentences])
 
 # ---- Trends ----
-NLP = spacy.load("en_core_web_sm", disable=["lemmatizer","textcat","tagger"])
-NLP.max_length = 2_000_000
 SAFE_ENTS = {"ORG","PRODUCT","GPE","NORP","EVENT","WORK_OF_ART"}
 
-def extract_terms(text):
-    if not text:
-        return []
-    doc = NLP(text[:10000])
+# extract_terms only reads doc.ents and doc.noun_chunks; everything else stays off in nlp.pipe
+TERM_PIPES = ("tok2vec", "parser", "attribute_ruler", "ner")
+
+def _terms_from_doc(doc):
     ents = [e.text for e in doc.ents if e.label_ in SAFE_ENTS and 2 <= len(e.text) <= 60]
     chunks = [ch.text for ch in doc.noun_chunks if len(ch.text) >= 3]
     raw = ents + chunks
@@ -211,26 +678,54 @@ def extract_terms(text):
             terms.append(tt)
     return terms
 
-def update_trends(kept, hist, window_weeks, new_min_sources, momentum_jump_pct):
+@metrics.timed("extract_terms", items=lambda args, out: len(out))
+def extract_terms_many(texts, batch_size=32, n_process=1):
+    """extract_terms over many texts via nlp.pipe; results are cached per content hash"""
+    results, todo = [None] * len(texts), {}
+    for i, text in enumerate(texts):
+        if not text:
+            results[i] = []
+            continue
+        key = content_hash(f"{nlp_tag()}\n{text[:10000]}")
+        cached = terms_cache().get(key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            todo.setdefault(key, []).append(i)
+    if todo:
+        keys = list(todo)
+        disable = [p for p in nlp().pipe_names if p not in TERM_PIPES]
+        docs = nlp().pipe((texts[todo[k][0]][:10000] for k in keys),
+                        batch_size=batch_size, n_process=n_process, disable=disable)
+        for key, doc in zip(keys, docs):
+            terms = _terms_from_doc(doc)
+            terms_cache().put(key, terms)
+            for i in todo[key]:
+                results[i] = terms
+    return results
+
+def extract_terms(text):
+    return extract_terms_many([text])[0]
+
+def update_trends(kept, hist, window_weeks, new_min_sources, momentum_jump_pct, batch_size=32, n_process=1):
     today = datetime.utcnow().date().isoformat()
     term_counts = defaultdict(int)
     term_sources = defaultdict(set)
-    for it in kept:
-        tset = set(extract_terms(f"{it['title']}. {it['text']}"))
+    all_terms = extract_terms_many([f"{it['title']}. {it['text']}" for it in kept], batch_size, n_process)
+    for it, terms in zip(kept, all_terms):
+        tset = set(terms)
+        copies = sources_of(it)
         for t in tset:
-            term_counts[t] += 1
-            term_sources[t].add(it["domain"])
-    hist.setdefault("terms", {})
+            term_counts[t] += len(copies)
+            term_sources[t].update(c["domain"] for c in copies)
     emerging, momentum = [], []
     for t,c in term_counts.items():
         srcs = len(term_sources[t])
-        series = hist["terms"].get(t, [])
-        last = series[-1]["count"] if series else 0
-        series.append({"date": today, "count": int(c), "sources": srcs})
-        if len(series) > window_weeks:
-            series = series[-window_weeks:]
-        hist["terms"][t] = series
-        prev_total = sum(x["count"] for x in series[:-1])
+        prev = [x for x in hist.series(t, limit=window_weeks) if x["date"] != today]
+        prev = prev[-(window_weeks - 1):] if window_weeks > 1 else []
+        last = prev[-1]["count"] if prev else 0
+        hist.record_term(t, today, c, srcs)
+        prev_total = sum(x["count"] for x in prev)
         if prev_total == 0 and srcs >= new_min_sources and c >= 2:
             emerging.append({"term": t, "count": int(c), "sources": srcs})
         elif last > 0:
@@ -239,41 +734,64 @@ def update_trends(kept, hist, window_weeks, new_min_sources, momentum_jump_pct):
                 momentum.append({"term": t, "count": int(c), "sources": srcs, "pct": round(inc)})
     emerging.sort(key=lambda x: (-x["count"], -x["sources"], x["term"]))
     momentum.sort(key=lambda x: (-x["pct"], -x["count"], x["term"]))
+    pruned = hist.prune(window_weeks, today=datetime.utcnow().date())
+    if pruned:
+        print(f"  pruned {pruned} term rows outside the {window_weeks}-week window")
     return emerging[:10], momentum[:10], hist
 
 # ---- Bucketing & impact ----
+# bucket() reads the first 1200 chars of text, estimate_impact() the first 800; both take
+# their hits from one cached keywords().scan() of title + first 1200 chars.
+LAUNCH_CUES = ["launches", "announces", "general availability", "integration", "release notes", "changelog",
+               "rollout", "feature"]
+ANALYST_CUES = ["mottola", "jon younger", "barry matthews", "josh bersin", "analyst", "commentary", "opinion"]
+RANKING_LISTS = ("funding_words", "contract_words", "reg_words", "launch_words")
+
+@lazy
+def keywords():
+    lists = {name: cfg()["ranking"][name] for name in RANKING_LISTS}
+    return KeywordMatcher({**lists, "launch_cues": LAUNCH_CUES, "analyst_cues": ANALYST_CUES},
+                          plurals=(*RANKING_LISTS, "analyst_cues"))
+
+@lazy
+def hard_filters():
+    """All hard_filters patterns as one regex"""
+    return compile_any(cfg().get("hard_filters", []))
+
+def keyword_hits(title, text, within=1200):
+    """Keyword categories hit in title + the first `within` chars of text"""
+    hits = keywords().scan(title + " " + text[:1200])
+    return {cat for cat, pos in hits.items() if pos < len(title) + 1 + within}
+
 def bucket(title, text):
     """Classify item into a section based on stronger cues"""
-    t = (title + " " + text[:1200]).lower()
-    if re.search(r"\b(launches|announces|general availability|integration|release notes|changelog|rollout|feature)\b", t):
+    hits = keyword_hits(title, text)
+    if "launch_cues" in hits:
         return "Product & Feature Signals"
-    if any(w in t for w in CFG["ranking"]["funding_words"]):
+    if "funding_words" in hits:
         return "Strategic Moves"
-    if any(w in t for w in CFG["ranking"]["reg_words"]):
+    if "reg_words" in hits:
         return "Regulation & Risk"
-    if any(n in t for n in ["mottola","jon younger","barry matthews","josh bersin","analyst","commentary","opinion"]):
+    if "analyst_cues" in hits:
         return "Influencer & Analyst Commentary"
-    if any(w in t for w in ["ai","automation","apac","low-code","no-code","niche","entrepreneurs","valuation","market growth"]):
-        return "Market & Trend Signals"
     return "Market & Trend Signals"
 
 def estimate_impact(item, section):
     """Estimate weighted score and impact level"""
     score = item["score"]
-    url = item["url"].lower()
-    text = (item["title"] + " " + item["text"][:800]).lower()
-    w = CFG["scoring"]["weights"].get(section, 1.0)
+    hits = keyword_hits(item["title"], item["text"], within=800)
+    w = cfg()["scoring"]["weights"].get(section, 1.0)
 
     # Stronger boosts for enterprise-relevant items
-    if any(d in url for d in CFG["ranking"]["big_vendor_domains"]):
+    if host_matches(item["url"], cfg()["ranking"]["big_vendor_domains"]):
         score += 0.12   # was 0.08
-    if any(wd in text for wd in CFG["ranking"]["funding_words"]):
+    if "funding_words" in hits:
         score += 0.05   # reduced to avoid noise
-    if any(wd in text for wd in CFG["ranking"]["contract_words"]):
+    if "contract_words" in hits:
         score += 0.07   # was 0.06
-    if any(wd in text for wd in CFG["ranking"]["reg_words"]):
+    if "reg_words" in hits:
         score += 0.10   # was 0.08
-    if any(wd in text for wd in CFG["ranking"]["launch_words"]):
+    if "launch_words" in hits:
         score += 0.10   # was 0.08
 
     # Reward clusters (multi-source validation)
@@ -290,7 +808,7 @@ def build_top10(kept, clusters):
         group = [kept[i] for i in g]
         main = group[0]
         sec = bucket(main["title"], main["text"])
-        main["cluster_size"] = len(group)
+        main["cluster_size"] = sum(len(sources_of(gi)) for gi in group)
         s, imp = estimate_impact(main, sec)
         rows.append({
             "title": main["title"],
@@ -301,7 +819,7 @@ def build_top10(kept, clusters):
             "summary_hint": group[0]["text"][:1400]
         })
     rows.sort(key=lambda r: (-r["score"], r["title"]))
-    return rows[:CFG["ranking"]["top_k"]]
+    return rows[:cfg()["ranking"]["top_k"]]
 
 # ---- Report rendering ----
 def render_report(today, bullets_by_section, top10, emerging, momentum):
@@ -329,125 +847,755 @@ def render_report(today, bullets_by_section, top10, emerging, momentum):
     for sec in order:
         if bullets_by_section.get(sec):
             out.append(f"\n## {sec}\n")
-            out += [f"- {b}" for b in bullets_by_section[sec][:CFG["max_items_per_section"]]]
+            out += [f"- {b}" for b in bullets_by_section[sec][:cfg()["max_items_per_section"]]]
+    return "\n".join(out)
+
+def run_notes(d):
+    """'Run notes' section for a degraded run (fetches skipped on budget or open circuits), or ''"""
+    if not d["skips"] and not d["hosts"]:
+        return ""
+    out = ["\n## Run notes\n", "_This run was degraded; some sources were not fetched in full._"]
+    for kind, by in sorted(d["skips"].items()):
+        parts = [f"{n} past the time budget" if reason == "budget" else f"{n} to hosts with an open circuit"
+                 for reason, n in sorted(by.items())]
+        note = " (summaries used instead of full text)" if kind == "articles" else ""
+        out.append(f"- {kind.capitalize()} skipped: {', '.join(parts)}{note}")
+    if d["hosts"]:
+        out.append(f"- Unresponsive hosts: {', '.join(d['hosts'])}")
     return "\n".join(out)
 
 # ---- Discovery bookkeeping ----
 def add_discovery(feed_url, reason):
-    DISC["pending"].setdefault(feed_url, {"weeks":0,"reason":reason})
+    disc()["pending"].setdefault(feed_url, {"weeks":0,"reason":reason})
+
+def queued_this_week():
+    """{"week", "count"}: feeds queued in the current ISO week, across daily and weekly runs"""
+    year, week, _ = datetime.utcnow().isocalendar()
+    queued = disc().setdefault("queued", {})
+    if queued.get("week") != f"{year}-W{week:02d}":
+        queued.update(week=f"{year}-W{week:02d}", count=0)
+    return queued
+
+def discover_from_kept(kept, known):
+    """Queue valid feeds linked from kept articles, up to max_new_sources_per_week across all
+    runs of the ISO week; known: feed URLs not to probe (updated in place)"""
+    new_feeds = []
+    discovery_cfg = sources().get("discovery", {})
+    if not discovery_cfg.get("expand_from_kept_links", True):
+        return new_feeds
+    cap = discovery_cfg.get("max_new_sources_per_week", 3)
+    queued = queued_this_week()
+    if queued["count"] >= cap:
+        return new_feeds
+    known |= set(disc().get("feeds", {})) | set(disc().get("pending", {}))
+    for it in kept:
+        for href in it.get("feed_links", []):
+            # A post's own /feed is its comment feed (WordPress), never a new source
+            if href in known or href.rstrip("/").removesuffix("/feed") == it["url"].rstrip("/") \
+                    or "comments/feed" in href:
+                continue
+            known.add(href)
+            try:
+                valid = validate_feed(href)
+            except net.Skipped as e:
+                count_skip("discovery", e)
+                continue
+            if valid:
+                add_discovery(href, reason=f"seen via {it['domain']}")
+                new_feeds.append(href)
+                queued["count"] += 1
+                print(f"   discovered new feed: {href}")
+                if queued["count"] >= cap:
+                    return new_feeds
+    return new_feeds
 
 def promote_discoveries():
     promoted = []
-    discovery_cfg = SRC.get("discovery", {})
+    discovery_cfg = sources().get("discovery", {})
     min_weeks = discovery_cfg.get("min_weeks_to_promote", 2)
-    for f, meta in list(DISC.get("pending", {}).items()):
+    for f, meta in list(disc().get("pending", {}).items()):
         if meta.get("weeks",0) >= min_weeks:
-            DISC["feeds"][f] = {"added": datetime.utcnow().isoformat(), "reason": meta.get("reason","")}
-            del DISC["pending"][f]
+            disc()["feeds"][f] = {"added": datetime.utcnow().isoformat(), "reason": meta.get("reason","")}
+            del disc()["pending"][f]
             promoted.append(f)
     return promoted
 
-# ---- MAIN ----
-def main():
-    print(">>> Entered main()")
-    inc, exc = CFG["intent"]["include"], CFG["intent"]["exclude"]
-    keep_thr = CFG["scoring"]["keep_threshold"]
+# ---- Per-item stage helpers (shared by batch and streaming runs) ----
+def feed_items(entries):
+    """Feed entries with a URL inside the lookback window, tagged with their domain"""
+    out = []
+    for it in entries:
+        if not it["url"]:
+            continue
+        if not is_recent(it["published"], days=cfg()["lookback_days"], tzname=cfg()["timezone"]):
+            continue
+        it["domain"] = domain(it["url"])
+        out.append(it)
+    return out
 
-    # Step 1: Build feeds
-    print(">>> Step 1: Building feed list")
-    feeds = set(SRC.get("rss", []))
-    feeds |= set(DISC.get("feeds", {}).keys())
-    for dom in SRC.get("domains", []):
+def page_items(links):
+    for it in links:
+        it["domain"] = domain(it["url"])
+    return links
+
+def extract_item(it):
+    try:
+        it["text"], it["feed_links"] = extract_main(it["url"], fallback=it["summary"])
+    except Exception as e:
+        if not isinstance(e, net.Skipped):  # skips are counted and reported as degraded
+            print(f"  text extraction failed for {it.get('url')}: {e}")
+        # scored on the feed summary only, so remember() keeps no decision and a later run retries
+        it["text"], it["feed_links"], it["summary_only"] = normalize_text(it.get("summary", "")), [], True
+    it["title"] = normalize_text(it["title"])
+    return it
+
+def score_and_keep(items, inc, exc, keep_thr, hard_filter, batch_size=64):
+    """Hard-filter, score and threshold items with full text; returns the kept ones in order.
+    Items whose text is unchanged since an earlier run reuse that run's score (seen_base)."""
+    kept = []
+    candidates = []
+    for it in items:
+        text_block = f"{it['title']}. {it['text']}"
+        base, text_hash = it.pop("seen_base", None), it.pop("seen_text", None)
+        if hard_filter.search(text_block):
+            print(f"  FILTERED (hard) {it['domain']:20} | title={it['title'][:60]}")
+            remember(it, "hard")
+            continue
+        th = content_hash(text_block)
+        candidates.append((it, text_block, th, base if base is not None and text_hash == th else None))
+    fresh = [c for c in candidates if c[3] is None]
+
+    try:
+        scores = score_items(
+            [tb for _, tb, _, _ in fresh], inc, exc,
+            [history().source_weight(it["domain"]) for it, _, _, _ in fresh],
+            batch_size=batch_size,
+        )
+    except Exception as e:
+        print(f"  batch scoring failed ({e}); scoring items one by one")
+        scores = []
+        for it, tb, _, _ in fresh:
+            try:
+                scores.append(score_item(tb, inc, exc, history().source_weight(it["domain"])))
+            except Exception as e:
+                print(f"  scoring failed for {it.get('url')}: {e}")
+                scores.append(None)
+    fresh_scores = dict(zip((id(c[0]) for c in fresh), scores))
+
+    for it, _, th, base in candidates:
+        sw = history().source_weight(it["domain"])
+        s = base + sw if base is not None else fresh_scores[id(it)]
+        if s is None:
+            continue
+        s = float(s)
+        it["score"] = s
+        decision = "KEPT" if s >= keep_thr and len(it["text"]) > 300 else "SKIPPED"
+        print(f"  {it['domain']:20} | score={s:.3f} | {decision} | title={it['title'][:60]}")
+        remember(it, "keep" if decision == "KEPT" else "drop", base=s - sw, text_hash=th)
+        if decision == "KEPT":
+            kept.append(it)
+    return kept
+
+# ---- Seen-item index ----
+# Decisions from earlier runs keyed by canonical URL: the title + summary they were made on,
+# the stage that made them and the score without its source weight. An unchanged feed entry
+# whose decision still holds under this week's weights and threshold is dropped before the
+# pre-filter; one kept (or scored) before skips the embedding if its text is unchanged too.
+@lazy
+def decision_fingerprint():
+    """Stored decisions only count while the prompts, filters and model they came from are unchanged"""
+    models = [backend().name] + ([prefilter_backend().name] if prefilter_backend_name() != backend_name() else [])
+    return content_hash(json.dumps([cfg()["intent"]["include"], cfg()["intent"]["exclude"],
+                                    cfg().get("hard_filters", []), *models]))
+
+def entry_hash(it):
+    return content_hash(f"{it['title']}\n{it.get('summary', '')}")
+
+def remember(it, decision, base=None, text_hash=None):
+    if not cfg().get("seen", {}).get("enabled", True) or it.get("summary_only"):
+        return
+    key = it.get("key") or canonical_url(it["url"])
+    entry = {"hash": entry_hash(it), "fp": decision_fingerprint(), "decision": decision,
+             "base": base, "text_hash": text_hash, "date": datetime.utcnow().date().isoformat()}
+    if SHARD_JOURNAL is not None:
+        SHARD_JOURNAL["seen"].append([key, it.get("_seq"), entry])
+        return
+    seen_index().put(key, entry)
+
+def reuse_decisions(items, keep_thr, pre_cutoff, keys=None):
+    """Collapse items sharing a canonical URL (first one wins) and drop those an earlier run
+    already decided against (pre-filter decisions against pre_cutoff); `keys` carries the URLs
+    seen so far across calls"""
+    keys = set() if keys is None else keys
+    reuse = cfg().get("seen", {}).get("enabled", True)
+    out, stats = [], {"duplicates": 0, "dropped": 0, "reused": 0}
+    for it in items:
+        key = it["key"] = canonical_url(it["url"])
+        if key in keys:
+            stats["duplicates"] += 1
+            continue
+        keys.add(key)
+        prev = seen_index().get(key) if reuse else None
+        if not prev or prev["fp"] != decision_fingerprint() or prev["hash"] != entry_hash(it):
+            out.append(it)
+            continue
+        sw, d = history().source_weight(it["domain"]), prev["decision"]
+        if d == "hard" or (d == "pre" and prev["base"] + sw < pre_cutoff) \
+                or (d == "drop" and prev["base"] + sw < keep_thr):
+            stats["dropped"] += 1
+            continue
+        if d in ("keep", "drop"):
+            it["seen_base"], it["seen_text"] = prev["base"], prev["text_hash"]
+            stats["reused"] += 1
+        out.append(it)
+    return out, stats
+
+# ---- Near-duplicates ----
+# Syndicated copies are folded into the first copy seen (its "duplicates") before full text
+# is fetched, then again on the extracted text. Only the representative is fetched, scored
+# and clustered; the copies still count as sources in clustering, ranking and trends.
+def near_duplicates():
+    nd_cfg = cfg().get("near_duplicates", {})
+    return NearDuplicates(max_distance=nd_cfg.get("max_distance", 5), min_words=nd_cfg.get("min_words", 8))
+
+def group_near_duplicates(items, index, text_of, source_of=lambda it: None):
+    """items minus copies of an earlier item in index (from another source_of); each copy is
+    recorded on its representative"""
+    out = []
+    for it in items:
+        rep = index.add(text_of(it), it, source_of(it))
+        if rep is None:
+            out.append(it)
+            continue
+        copy = {k: it.get(k, "") for k in ("url", "domain", "title", "feed")}
+        rep.setdefault("duplicates", []).extend([copy] + it.get("duplicates", []))
+        it["_dup"] = True
+    return out
+
+def entry_text(it):
+    return f"{it['title']}. {it.get('summary', '')}"
+
+def entry_feed(it):
+    """Entries of one feed may share a boilerplate summary, so only other feeds' copies group"""
+    return it.get("feed")
+
+def article_text(it):
+    return it.get("text", "")
+
+def sources_of(it):
+    """The item followed by its near-duplicate copies"""
+    return [it] + it.get("duplicates", [])
+
+# ---- Streaming pipeline ----
+# Steps 2-4 as threads connected by bounded queues (collect → seen/pre-filter → extract → score),
+# so scoring starts on the first articles while feeds are still downloading and a slow
+# stage applies backpressure upstream. Every item carries its batch-mode position and the
+# outputs are re-sorted at the end, so run["items"] / run["kept"] match a stage-by-stage run.
+# If any thread fails it sets `stop`; blocked puts and gets give up within `wait` seconds, so
+# the run raises the error instead of hanging on a full or never-finished queue.
+_DONE = object()
+
+class _Stopped(Exception):
+    pass
+
+def _put(q, x, stop, wait=0.5):
+    """q.put(x) that raises _Stopped once stop is set instead of blocking on a full queue"""
+    while True:
+        if stop.is_set():
+            raise _Stopped()
         try:
-            new = discover_feeds_for_domain(dom)
-            if new:
-                print(f"  discovered {len(new)} feeds for {dom}")
-            feeds |= set(new)
-        except Exception as e:
-            print(f"  domain failed: {dom} ({e})")
-    print(f"Total feeds to check: {len(feeds)}")
+            return q.put(x, timeout=wait)
+        except queue.Full:
+            continue
 
-    # Step 2: Collect items
-    print(">>> Step 2: Collecting feed items")
-    items = []
-    for feed in sorted(feeds):
-        print(f"   checking feed: {feed}")
+def _batches(q, size, stop, producers=1, wait=0.5):
+    """Lists of up to `size` items from q until every producer has sent _DONE;
+    a partial batch is flushed once the queue has been idle for `wait` seconds.
+    Raises _Stopped once stop is set."""
+    batch, done = [], 0
+    while done < producers:
+        if stop.is_set():
+            raise _Stopped()
         try:
-            for it in fetch_feed(feed):
-                if not it["url"]:
-                    continue
-                if not is_recent(it["published"], days=CFG["lookback_days"], tzname=CFG["timezone"]):
-                    continue
-                it["domain"] = domain(it["url"])
-                items.append(it)
-        except Exception as e:
-            print(f"  feed failed: {feed} ({e})")
+            x = q.get(timeout=wait)
+        except queue.Empty:
+            if batch:
+                yield batch
+                batch = []
             continue
-    print(f"Collected {len(items)} raw items")
+        if x is _DONE:
+            done += 1
+            continue
+        batch.append(x)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    # Step 2b: Collect items from pages
-    print(">>> Step 2b: Collecting page items")
-    for page in SRC.get("pages", []):
-        print(f"   crawling page: {page}")
+def stage_stream(run):
+    print(">>> Steps 2-4: Streaming collect → pre-filter → extract → score")
+    fetch_cfg, pre_cfg, st_cfg = cfg().get("fetch", {}), cfg().get("prefilter", {}), cfg().get("stream", {})
+    workers, per_host = fetch_cfg.get("workers", 16), fetch_cfg.get("per_host", 2)
+    n_extract = max(1, st_cfg.get("extract_workers", 8))
+    qsize = st_cfg.get("queue_size", 256)
+    batch_size = cfg()["scoring"].get("batch_size", 64)
+    inc, exc = cfg()["intent"]["include"], cfg()["intent"]["exclude"]
+    keep_thr, pre_cutoff = keep_threshold(), prefilter_cutoff()
+    hard_filter = hard_filters()
+
+    q_pre, q_extract, q_score = queue.Queue(qsize), queue.Queue(qsize), queue.Queue(qsize)
+    lock = threading.Lock()
+    counts = {"collected": 0, "hard": 0, "low": 0, "duplicates": 0, "dropped": 0, "reused": 0, "copies": 0}
+    keys = set()
+    dedupe = cfg().get("near_duplicates", {}).get("enabled", True)
+    entry_index, text_index = near_duplicates(), near_duplicates()
+    extracted, kept, errors = [], [], []
+    stop = threading.Event()
+
+    def fail(e):
+        if not isinstance(e, _Stopped):
+            errors.append(e)
+        stop.set()
+
+    def collect():
         try:
-            page_items = extract_links_from_page(page)
-            for it in page_items:
-                it["domain"] = domain(it["url"])
-                items.append(it)
+            jobs = [(fetch_feed, u) for u in run["feeds"]] + [(extract_links_from_page, p) for p in sources().get("pages", [])]
+            def fetch(fn, u):
+                with host_slot(u, per_host):
+                    return fn(u)
+            pool = ThreadPoolExecutor(max_workers=max(1, workers))
+            try:
+                futures = {pool.submit(fetch, fn, u): i for i, (fn, u) in enumerate(jobs)}
+                # results go on in job order (a reorder buffer), so the seen-index URL collapse
+                # and near-duplicate grouping downstream pick the same first copy as a batch run
+                done, nxt = {}, 0
+                for fut in as_completed(futures):
+                    done[futures[fut]] = fut.result()
+                    while nxt in done:
+                        (fn, u), res = jobs[nxt], done.pop(nxt)
+                        if fn is fetch_feed:
+                            got = feed_items(res)
+                        else:
+                            got = page_items(res)
+                            print(f"   crawled page: {u} → {len(got)} links")
+                        for j, it in enumerate(got):
+                            it["_seq"] = (nxt, j)
+                            counts["collected"] += 1
+                            _put(q_pre, it, stop)
+                        nxt += 1
+            finally:
+                pool.shutdown(cancel_futures=True)   # after a failure, start no more fetches
+            _put(q_pre, _DONE, stop)
         except Exception as e:
-            print(f"  page failed: {page} ({e})")
-            continue
-    print(f"Total items (feeds + pages): {len(items)}")
+            fail(e)
+
+    def prefilter():
+        n_out = 0
+        try:
+            for group in _batches(q_pre, batch_size, stop):
+                group, st = reuse_decisions(group, keep_thr, pre_cutoff, keys=keys)
+                for k, v in st.items():
+                    counts[k] += v
+                if pre_cfg.get("enabled", True):
+                    group, pre = prefilter_items(group, inc, exc, pre_cutoff, hard_filter,
+                                                 min_chars=pre_cfg.get("min_chars", 80), batch_size=batch_size)
+                    counts["hard"] += pre["hard"]
+                    counts["low"] += pre["low"]
+                if dedupe:
+                    n = len(group)
+                    group = group_near_duplicates(group, entry_index, entry_text, entry_feed)
+                    counts["copies"] += n - len(group)
+                for it in group:
+                    it["_n"], n_out = n_out, n_out + 1   # extraction finishes out of order; see score()
+                    _put(q_extract, it, stop)
+            for _ in range(n_extract):
+                _put(q_extract, _DONE, stop)
+        except Exception as e:
+            fail(e)
 
+    def extract():
+        try:
+            for group in _batches(q_extract, 1, stop, wait=0.1):
+                it = group[0]
+                with host_slot(it["url"], per_host):
+                    extract_item(it)
+                with lock:
+                    extracted.append(it)
+                _put(q_score, it, stop)
+            _put(q_score, _DONE, stop)
+        except Exception as e:
+            fail(e)
 
-    # Step 3: Fetch article text
-    print(">>> Step 3: Fetching article text")
-    for it in items:
+    def score():
         try:
-            it["text"] = extract_main(it["url"], fallback=it["summary"])
-            it["title"] = normalize_text(it["title"])
+            # extracted items are released in the order they left the pre-filter, so the
+            # article-text near-duplicate pass picks the same representative as a batch run
+            waiting, nxt = {}, 0
+            for got in _batches(q_score, batch_size, stop, producers=n_extract):
+                for it in got:
+                    waiting[it.pop("_n")] = it
+                group = []
+                while nxt in waiting:
+                    group.append(waiting.pop(nxt))
+                    nxt += 1
+                if not group:
+                    continue
+                if dedupe:
+                    n = len(group)
+                    group = group_near_duplicates(group, text_index, article_text)
+                    counts["copies"] += n - len(group)
+                kept.extend(score_and_keep(group, inc, exc, keep_thr, hard_filter, batch_size=batch_size))
         except Exception as e:
-            print(f"  text extraction failed for {it.get('url')}: {e}")
-            it["text"] = normalize_text(it.get("summary", ""))
-    print("Fetched article text for all items")
+            fail(e)
 
-    # Step 4: Score & keep
-    print(">>> Step 4: Scoring items")
-    kept = []
-    hard_filters = [re.compile(pat) for pat in CFG.get("hard_filters", [])]
+    threads = [threading.Thread(target=collect), threading.Thread(target=prefilter),
+               threading.Thread(target=score)] + [threading.Thread(target=extract) for _ in range(n_extract)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+    by_seq = lambda it: it["_seq"]
+    run["items"] = sorted((it for it in extracted if not it.pop("_dup", False)), key=by_seq)
+    run["kept"] = sorted(kept, key=by_seq)
+    for it in run["items"]:
+        it.pop("_seq", None)
+    print(f"Collected {counts['collected']} items; seen index: {counts['duplicates']} duplicate URLs, "
+          f"{counts['dropped']} already decided, {counts['reused']} reuse a score; "
+          f"pre-filter: {counts['hard']} hard-filtered, {counts['low']} below intent; "
+          f"{counts['copies']} near-duplicate copies; fetched {len(run['items'])} (avoided {counts['collected'] - len(run['items'])} fetches)")
+    print(f"Article cache: {articles().stats()}")
+    print(http_counts_line())
+    print(f"HTTP client: {net.summary()}")
+    print(f"Kept {len(run['kept'])} items")
+    print(f"Seen index: {seen_index().stats()}")
+    articles().save()
+    seen_index().save()
+
+# ---- Sharded runs ----
+# --shards N splits the Step 1 feed and page list N ways by a stable hash of the host (so
+# per-host limits still hold) and runs Steps 2-4 for each part in its own process
+# (--shard I/N; separate CI jobs work too, given the run directory). A worker only reads the
+# shared state: its seen-index decisions and feed polls are journaled and its cache updates
+# exported into <run-dir>/shards/I-of-N/. The merge restores the single-process item order,
+# collapses URLs across shards, redoes the near-duplicate grouping, then applies the
+# journals, so the report matches a single-process run. Workers skip near-duplicate
+# grouping, which needs every shard's items, so syndicated copies are fetched once per copy.
+SHARD_JOURNAL = None   # {"seen": [...], "feed_polls": [...]} while running as a shard worker
+SHARD_COMMAND = [sys.executable, "-u", "-m", "src.main"]   # + --shard I/N ... (the bench swaps in its sandbox)
 
+def shard_of(url, n):
+    return int(content_hash(net.host(url))[:8], 16) % n
+
+def shard_sources(feeds):
+    """(function, url) for every feed and page in Steps 2/2b order; an item's _seq starts with
+    its source's index here"""
+    return [(fetch_feed, u) for u in feeds] + [(extract_links_from_page, p) for p in sources().get("pages", [])]
+
+def shard_plan(feeds, n):
+    """Fingerprint of the feed list and shard count a worker ran with"""
+    return content_hash(json.dumps([feeds, sources().get("pages", []), n]))
+
+def shard_dir(run_dir, i, n):
+    return Path(run_dir) / "shards" / f"{i}-of-{n}"
+
+def stage_shard(run):
+    i, n = run["shard"]
+    print(f">>> Steps 2-4: Shard {i + 1} of {n}")
+    fetch_cfg = cfg().get("fetch", {})
+    workers, per_host = fetch_cfg.get("workers", 16), fetch_cfg.get("per_host", 2)
+    mine = [(g, fn, u) for g, (fn, u) in enumerate(shard_sources(run["feeds"])) if shard_of(u, n) == i]
+    before = {u: dict(v) for u, v in validators().items()}
+    items = []
+    for fn, tag in ((fetch_feed, feed_items), (extract_links_from_page, page_items)):
+        seq = {u: g for g, f, u in mine if f is fn}
+        for u, got in fetch_concurrently(fn, list(seq), workers, per_host):
+            for j, it in enumerate(tag(got)):
+                it["_seq"] = [seq[u], j]
+                items.append(it)
+    print(f"Collected {len(items)} raw items from {len(mine)} feeds and pages")
+    first_seen = {}
     for it in items:
-        try:
-            text_block = f"{it['title']}. {it['text']}"
+        first_seen.setdefault(canonical_url(it["url"]), it["_seq"])
+    run["items"] = items
+    stage_seen(run)
+    stage_prefilter(run)
+    # entries as Step 2e sees them (before extraction rewrites the title)
+    entries = [{k: v for k, v in it.items() if k not in ("seen_base", "seen_text")} for it in run["items"]]
+    print(f">>> Step 3: Fetching article text for {len(entries)} items")
+    for it in run["items"]:
+        extract_item(it)
+    print(">>> Step 4: Scoring items")
+    kept = score_and_keep(run["items"], cfg()["intent"]["include"], cfg()["intent"]["exclude"],
+                          keep_threshold(), hard_filters(), batch_size=cfg()["scoring"].get("batch_size", 64))
+    print(f"Kept {len(kept)} of {len(run['items'])} items")
+    for entry, it in zip(entries, run["items"]):
+        entry["fetched"] = {k: it[k] for k in ("title", "text", "feed_links", "score", "summary_only") if k in it}
+    keys, rows = embeddings().changes()
+    Path(run["run_dir"]).mkdir(parents=True, exist_ok=True)
+    np.savez(Path(run["run_dir"]) / "embeddings.npz", keys=np.array(keys, dtype=str), rows=rows)
+    changed = {u: v for u, v in validators().items() if before.get(u) != v}
+    changed.update({u: None for u in before if u not in validators()})
+    run.update(plan=shard_plan(run["feeds"], n), first_seen=first_seen, items=entries,
+               kept=[it["_seq"] for it in kept],
+               journal={**SHARD_JOURNAL, "articles": articles().changes(), "validators": changed,
+                        "degraded": degraded(), "http": http_counts()})
 
-            # --- Hard filter check ---
-            if any(p.search(text_block) for p in hard_filters):
-                print(f"  FILTERED (hard) {it['domain']:20} | title={it['title'][:60]}")
-                continue
+def run_shard(run_dir, i, n, profile=False):
+    """Steps 2-4 for shard i of n, from the feed list checkpointed in run_dir"""
+    global SHARD_JOURNAL
+    if not checkpoint_path(run_dir, "feeds").exists():
+        raise SystemExit(f"no feed list in {run_dir}; run Step 1 first (--shards {n} --to-stage feeds)")
+    SHARD_JOURNAL = {"seen": [], "feed_polls": []}
+    out_dir = shard_dir(run_dir, i, n)
+    run = run_pipeline(out_dir, stages=SHARD_WORKER_STAGES, profile=profile, shard=[i, n],
+                       feeds=load_checkpoint(run_dir, "feeds")["feeds"])
+    metrics.write(out_dir / "metrics.json", date=run["date"], mode="shard", shard=f"{i}/{n}", degraded=degraded(),
+                  conditional_get=http_counts())
+    return run
+
+def spawn_shards(run_dir, todo, n):
+    """Run the listed shards as worker processes, logging to <run-dir>/shards/I-of-N.log"""
+    procs = []
+    for i in todo:
+        log = shard_dir(run_dir, i, n).with_suffix(".log")
+        log.parent.mkdir(parents=True, exist_ok=True)
+        cmd = SHARD_COMMAND + ["--shard", f"{i}/{n}", "--run-dir", str(run_dir), "--backend", backend_name()]
+        if net.time_left() is not None:   # workers get what is left of this stage's budget
+            cmd += ["--budget", f"{max(net.time_left(), 0.06) / 60:.3f}"]
+        with log.open("w", encoding="utf-8") as f:
+            procs.append((i, log, subprocess.Popen(cmd, cwd=ROOT, stdout=f, stderr=subprocess.STDOUT)))
+    for i, log, proc in procs:
+        if proc.wait():
+            tail = "".join(log.read_text(encoding="utf-8", errors="replace").splitlines(True)[-20:])
+            raise RuntimeError(f"shard {i}/{n} failed (exit {proc.returncode}), see {log}:\n{tail}")
+        print(f"  shard {i + 1} of {n} done ({log})")
 
-            # --- Normal scoring ---
-            sw = float(HIST["sources"].get(it["domain"], 0.0))
-            s = score_item(text_block, inc, exc, sw)
-            it["score"] = s
+def stage_merge(run):
+    n, run_dir = run["shards"], Path(run["run_dir"])
+    plan = shard_plan(run["feeds"], n)
+    def load(i):
+        d = shard_dir(run_dir, i, n)
+        out = load_checkpoint(d, "shard") if checkpoint_path(d, "shard").exists() else None
+        return out if out and out["plan"] == plan else None
+    outs = [load(i) for i in range(n)]
+    todo = [i for i, out in enumerate(outs) if out is None]
+    if todo:
+        print(f">>> Steps 2-4: Running {len(todo)} of {n} shards in worker processes")
+        # workers read this run's feed list from the checkpoint (also under --no-checkpoint)
+        save_checkpoint(run_dir, "feeds", {**{k: run[k] for k in ("feeds", "skipped_feeds") if k in run},
+                                           "degraded": degraded()})
+        spawn_shards(run_dir, todo, n)
+        outs = [out or load(i) for i, out in enumerate(outs)]
+        if None in outs:
+            raise RuntimeError(f"shard {outs.index(None)}/{n} left no output in {run_dir / 'shards'}")
+    print(f">>> Merging {n} shards")
+    first = {}
+    for out in outs:
+        for key, seq in out["first_seen"].items():
+            if key not in first or seq < first[key]:
+                first[key] = seq
+    # Step 2c across shards: only each URL's first occurrence goes on
+    items = sorted((it for out in outs for it in out["items"] if first[it["key"]] == it["_seq"]),
+                   key=lambda it: it["_seq"])
+    fetched = {tuple(it["_seq"]): it.pop("fetched") for it in items}
+    kept_seqs = {tuple(seq) for out in outs for seq in out["kept"]}
+    dedupe = cfg().get("near_duplicates", {}).get("enabled", True)
+    reps = group_near_duplicates(items, near_duplicates(), entry_text, entry_feed) if dedupe else items
+    for it in reps:
+        it.update(fetched[tuple(it["_seq"])])
+    if dedupe:
+        reps = group_near_duplicates(reps, near_duplicates(), article_text)
+    scored = {tuple(it["_seq"]) for it in reps}
+    passed = {tuple(it["_seq"]) for it in items}
+    # Decisions count for each URL's first occurrence, unless it turned out to be a copy
+    for out in outs:
+        for key, seq, entry in out["journal"]["seen"]:
+            if seq == first.get(key) and (tuple(seq) in scored or tuple(seq) not in passed):
+                seen_index().put(key, entry)
+        for poll in out["journal"]["feed_polls"]:
+            history().record_feed_poll(*poll)
+        for url, v in out["journal"]["validators"].items():
+            if v is None:
+                validators().pop(url, None)
+            else:
+                validators()[url] = v
+        articles().merge(out["journal"]["articles"])
+        restore_degraded(out["journal"].get("degraded", {}))
+        restore_http_counts(out["journal"].get("http", {}))
+    for i in range(n):
+        npz = np.load(shard_dir(run_dir, i, n) / "embeddings.npz")
+        embeddings().merge(list(npz["keys"]), npz["rows"])
+    run["kept"] = [it for it in reps if tuple(it["_seq"]) in kept_seqs]
+    run["items"] = reps
+    for it in reps:
+        it.pop("_seq", None)
+    run["shard_metrics"] = [json.loads(p.read_text()) for i in range(n)
+                            if (p := shard_dir(run_dir, i, n) / "metrics.json").exists()]
+    print(f"Merged {sum(len(out['items']) for out in outs)} shard items: {len(items)} after collapsing URLs, "
+          f"{len(reps)} after near-duplicates; kept {len(run['kept'])}")
+    print(f"{http_counts_line()} across shards")
+    articles().save()
+    seen_index().save()
 
-            decision = "KEPT" if s >= keep_thr and len(it["text"]) > 300 else "SKIPPED"
-            print(f"  {it['domain']:20} | score={s:.3f} | {decision} | title={it['title'][:60]}")
+# ---- Checkpoints ----
+# Each stage's output is written to data/runs/<date>/<stage>.json.gz so a crashed or
+# re-triggered run can pick up where it stopped (--resume) and config tweaks can rerun
+# only the affected stages (--from-stage score).
+RUNS_DIR = DATA_DIR / "runs"
 
-            if decision == "KEPT":
-                kept.append(it)
+def checkpoint_path(run_dir, stage):
+    return run_dir / f"{stage}.json.gz"
 
-        except Exception as e:
-            print(f"  scoring failed for {it.get('url')}: {e}")
+def save_checkpoint(run_dir, stage, data):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    tmp = checkpoint_path(run_dir, stage).with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    tmp.replace(checkpoint_path(run_dir, stage))
+
+def load_checkpoint(run_dir, stage):
+    with gzip.open(checkpoint_path(run_dir, stage), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def prune_runs(keep=4):
+    for old in sorted(p for p in RUNS_DIR.glob("*") if p.is_dir())[:-keep or None]:
+        shutil.rmtree(old, ignore_errors=True)
+
+# ---- Pipeline stages ----
+def stage_feeds(run):
+    # Step 1: Build feeds
+    print(">>> Step 1: Building feed list")
+    fetch_cfg = cfg().get("fetch", {})
+    workers, per_host = fetch_cfg.get("workers", 16), fetch_cfg.get("per_host", 2)
+    discovery_cfg = sources().get("discovery", {})
+    feeds = set(sources().get("rss", []))
+    feeds |= set(disc().get("feeds", {}).keys())
+    domains = sources().get("domains", [])
+    refresh = os.getenv("REFRESH_DISCOVERY", "0") == "1"
+    stale = [d for d in domains if refresh or discovery_expired(
+        d, discovery_cfg.get("cache_ttl_days", 28), discovery_cfg.get("negative_ttl_days", 7))]
+    print(f"  discovery cache: {len(domains) - len(stale)} fresh, probing {len(stale)} domains")
+    # a re-probe re-checks paths whose verdict is older than the shortest domain TTL, so a
+    # feed that appeared since the last probe is found (Step 10's verdicts last longer)
+    probe = functools.partial(discover_feeds_for_domain, ttl_days=discovery_cfg.get("negative_ttl_days", 7),
+                              force=refresh)
+    for dom, new in fetch_concurrently(probe, stale, workers, per_host):
+        if new is None:
+            continue  # probe again next run
+        if new:
+            print(f"  discovered {len(new)} feeds for {dom}")
+        disc_cache()[dom] = {"feeds": new, "checked": datetime.utcnow().isoformat()}
+    if stale:
+        DISC_CACHE_PATH.write_text(json.dumps(disc_cache(), indent=2, sort_keys=True))
+    for dom in domains:
+        feeds |= set(disc_cache().get(dom, {}).get("feeds", []))
+    skipped = {}
+    sch = cfg().get("schedule", {})
+    if sch.get("enabled", True) and os.getenv("POLL_ALL_FEEDS", "0") != "1":
+        today, stats = datetime.utcnow().date(), history().feed_stats()
+        for f in sorted(feeds):
+            due, why = feed_due(stats.get(f), today, sch)
+            if not due:
+                skipped[f] = why
+    print(f"Total feeds to check: {len(feeds) - len(skipped)} ({len(skipped)} skipped by the feed schedule)")
+    run["feeds"] = sorted(feeds - set(skipped))
+    run["skipped_feeds"] = skipped
+
+def stage_collect(run):
+    # Step 2: Collect items
+    print(">>> Step 2: Collecting feed items")
+    fetch_cfg = cfg().get("fetch", {})
+    workers, per_host = fetch_cfg.get("workers", 16), fetch_cfg.get("per_host", 2)
+    items = []
+    for feed, entries in fetch_concurrently(fetch_feed, run["feeds"], workers, per_host):
+        items += feed_items(entries)
+    print(f"Collected {len(items)} raw items")
 
+    # Step 2b: Collect items from pages
+    print(">>> Step 2b: Collecting page items")
+    for page, links in fetch_concurrently(extract_links_from_page, sources().get("pages", []), workers, per_host):
+        print(f"   crawled page: {page} → {len(links)} links")
+        items += page_items(links)
+    print(f"Total items (feeds + pages): {len(items)}")
+    print(http_counts_line())
+    print(f"HTTP client: {net.summary()}")
+    run["items"] = items
+
+def stage_seen(run):
+    # Step 2c: Collapse duplicate URLs and reuse earlier runs' decisions
+    print(">>> Step 2c: Checking the seen-item index")
+    items = run["items"]
+    run["items"], st = reuse_decisions(items, keep_threshold(), prefilter_cutoff())
+    print(f"Seen index: {st['duplicates']} duplicate URLs collapsed, {st['dropped']} dropped as already decided, "
+          f"{st['reused']} reuse an earlier score; {len(run['items'])} of {len(items)} items go on")
+
+def stage_prefilter(run):
+    # Step 2d: Pre-filter before fetching full text
+    pre_cfg = cfg().get("prefilter", {})
+    if not pre_cfg.get("enabled", True):
+        return
+    print(">>> Step 2d: Pre-filtering items")
+    items = run["items"]
+    inc, exc = cfg()["intent"]["include"], cfg()["intent"]["exclude"]
+    run["items"], pre = prefilter_items(items, inc, exc, prefilter_cutoff(), hard_filters(),
+                                        min_chars=pre_cfg.get("min_chars", 80),
+                                        batch_size=cfg()["scoring"].get("batch_size", 64))
+    print(f"Pre-filter: {pre['hard']} hard-filtered, {pre['low']} below intent; "
+          f"fetching {len(run['items'])} of {len(items)} (avoided {len(items) - len(run['items'])} fetches)")
+
+def stage_dupes(run):
+    # Step 2e: Fold near-duplicate feed entries into one representative
+    if not cfg().get("near_duplicates", {}).get("enabled", True):
+        return
+    print(">>> Step 2e: Grouping near-duplicates")
+    items = run["items"]
+    run["items"] = group_near_duplicates(items, near_duplicates(), entry_text, entry_feed)
+    print(f"Near-duplicates: fetching {len(run['items'])} representatives for {len(items)} items")
+
+def stage_extract(run):
+    # Step 3: Fetch article text
+    print(">>> Step 3: Fetching article text")
+    for it in run["items"]:
+        extract_item(it)
+    print("Fetched article text for all items")
+    if cfg().get("near_duplicates", {}).get("enabled", True):
+        n = len(run["items"])
+        run["items"] = group_near_duplicates(run["items"], near_duplicates(), article_text)
+        print(f"Near-duplicates: {n - len(run['items'])} more copies found in article text")
+    print(f"Article cache: {articles().stats()}")
+    articles().save()
 
+def stage_score(run):
+    # Step 4: Score & keep
+    print(">>> Step 4: Scoring items")
+    inc, exc = cfg()["intent"]["include"], cfg()["intent"]["exclude"]
+    keep_thr = keep_threshold()
+    kept = score_and_keep(run["items"], inc, exc, keep_thr, hard_filters(),
+                          batch_size=cfg()["scoring"].get("batch_size", 64))
     print(f"Kept {len(kept)} items")
+    print(f"Seen index: {seen_index().stats()}")
+    seen_index().save()
+    run["kept"] = kept
 
+def stage_cluster(run):
     # Step 5: Clustering
     print(">>> Step 5: Clustering kept items")
     seen = set()
-    kept = [k for k in kept if not (k["url"] in seen or seen.add(k["url"]))]
-    clusters = cluster_items(kept, sim_thr=0.72)
-    print(f"Formed {len(clusters)} clusters")
+    kept = [k for k in run["kept"] if not (k["url"] in seen or seen.add(k["url"]))]
+    cl_cfg = cfg().get("clustering", {})
+    run["kept"] = kept
+    run["clusters"] = cluster_items(kept, sim_thr=cluster_threshold(),
+                                    method=cl_cfg.get("method", "leader"), block_mb=cl_cfg.get("block_mb", 64))
+    print(f"Formed {len(run['clusters'])} clusters")
+    print(f"Embedding store: {embeddings().stats()}")
+    save_embeddings()
+
+def stage_report(run):
+    kept, clusters = run["kept"], run["clusters"]
 
     # Step 6: Bullets per section
     print(">>> Step 6: Building bullets per section")
@@ -458,8 +1606,9 @@ def main():
         main_item = group[0]
         sec = bucket(main_item["title"], blob)
         summary = summarize(blob, sentences=3)
+        copies = [src for gi in group for src in sources_of(gi)]
         bullet = f"{summary} *(sources: " + ", ".join(
-            [f'[{"1" if i==0 else str(i+1)}]({gi["url"]})' for i,gi in enumerate(group[:5])]
+            [f'[{"1" if i==0 else str(i+1)}]({gi["url"]})' for i,gi in enumerate(copies[:5])]
         ) + ")*"
         sections[sec].append(bullet)
     print("Section bullets built")
@@ -471,66 +1620,52 @@ def main():
 
     # Step 8: Trends
     print(">>> Step 8: Updating trends")
-    emerging, momentum, new_hist = update_trends(
-        kept=kept, hist=HIST,
-        window_weeks=CFG["trends"]["window_weeks"],
-        new_min_sources=CFG["trends"]["new_min_sources"],
-        momentum_jump_pct=CFG["trends"]["momentum_jump_pct"],
+    emerging, momentum, _ = update_trends(
+        kept=kept, hist=history(),
+        window_weeks=cfg()["trends"]["window_weeks"],
+        new_min_sources=cfg()["trends"]["new_min_sources"],
+        momentum_jump_pct=cfg()["trends"]["momentum_jump_pct"],
+        batch_size=cfg()["trends"].get("batch_size", 32),
+        n_process=cfg()["trends"].get("n_process", 1),
     )
-    HIST.update(new_hist)
     print(f"Emerging: {len(emerging)}, Momentum: {len(momentum)}")
+    print(f"Term cache: {terms_cache().stats()}")
 
     # Step 9: Domain reputation
     print(">>> Step 9: Updating domain reputation")
     for it in kept:
-        d = it["domain"]
-        HIST["sources"][d] = max(-0.05, min(0.10, HIST["sources"].get(d, 0.0) + 0.01))
+        for d in [c["domain"] for c in sources_of(it)]:
+            history().set_source_weight(d, max(-0.05, min(0.10, history().source_weight(d) + 0.01)))
+    feed_kept = defaultdict(int)
+    for it in kept:
+        for c in sources_of(it):
+            if c.get("feed"):
+                feed_kept[c["feed"]] += 1
+    for feed, n in feed_kept.items():
+        history().record_feed_kept(feed, run["date"], n)
 
-    # Step 10: Discovery
-    print(">>> Step 10: Discovery from kept links")
+    # Step 10: Discovery (a --report run has no feed list and stays off the network; its
+    # items were probed by the daily ingest that kept them)
     new_feeds = []
-    discovery_cfg = SRC.get("discovery", {})
-    if discovery_cfg.get("expand_from_kept_links", True):
-        cap = discovery_cfg.get("max_new_sources_per_week", 3)
-        for it in kept:
-            try:
-                res = requests_get(it["url"], timeout=5)
-                if not res.ok:
-                    continue
-                soup = BeautifulSoup(res.text, "html.parser")
-                for link in soup.find_all("link", {"rel": "alternate"}):
-                    if "rss" in (link.get("type") or "") or "atom" in (link.get("type") or ""):
-                        href = link.get("href")
-                        if href and href.startswith("http"):
-                            if href not in feeds and href not in DISC.get("feeds", {}) and href not in DISC.get("pending", {}):
-                                fp = feedparser.parse(href)
-                                if fp.bozo == 0 and fp.entries:
-                                    add_discovery(href, reason=f"seen via {it['domain']}")
-                                    new_feeds.append(href)
-                                    print(f"   discovered new feed: {href}")
-                                    if len(new_feeds) >= cap:
-                                        break
-                if len(new_feeds) >= cap:
-                    break
-            except Exception as e:
-                print(f"  discovery failed for {it.get('url')}: {e}")
-                continue
-    print(f"New feeds queued: {len(new_feeds)}")
+    if "feeds" in run:
+        print(">>> Step 10: Discovery from kept links")
+        new_feeds = discover_from_kept(kept, set(run["feeds"]) | set(run.get("skipped_feeds", {})))
+        print(f"New feeds queued: {len(new_feeds)}")
 
     # Step 11: Render report
     print(">>> Step 11: Rendering report")
-    today = datetime.utcnow().date().isoformat()
+    today = run["date"]
     report_md = render_report(today, sections, top10, emerging, momentum)
     if not report_md.strip():
         report_md = f"# Weekly FMS Brief — {today}\n\n_No items were collected this week._"
+    report_md += run_notes(degraded())
     outpath = REPORT_DIR / f"{today}.md"
     outpath.write_text(report_md, encoding="utf-8")
     print(f"Wrote report to {outpath}")
 
     # Step 12: Save data
     print(">>> Step 12: Saving data snapshots")
-    HIST_PATH.write_text(json.dumps(HIST, indent=2))
-    DISC_PATH.write_text(yaml.safe_dump(DISC, sort_keys=False))
+    save_state()
     items_csv = REPORT_DIR / f"items-{today}.csv"
     items_json = REPORT_DIR / f"items-{today}.json"
     with items_csv.open("w", newline="", encoding="utf-8") as f:
@@ -539,10 +1674,237 @@ def main():
         for it in kept:
             w.writerow([it["title"], it["url"], it["domain"], f"{it['score']:.3f}"])
     items_json.write_text(json.dumps(kept, ensure_ascii=False, indent=2))
+    if "feeds" in run:
+        write_feed_report(run)
 
     print(">>> Step 13: Done")
+    print(f"HTTP client: {net.summary()}")
     print(f"Kept {len(kept)} items across {len(clusters)} clusters. New feeds queued: {len(new_feeds)}. Promoted: {len(promote_discoveries())}.")
 
+def save_state():
+    history().save()
+    DISC_PATH.write_text(yaml.safe_dump(disc(), sort_keys=False))
+    validators_path().parent.mkdir(parents=True, exist_ok=True)
+    validators_path().write_text(json.dumps(validators(), sort_keys=True))
+    articles().save()
+    save_embeddings()
+    terms_cache().save()
+    feed_checks().save()
+    seen_index().save()
+
+def write_feed_report(run):
+    stats = history().feed_stats()
+    skipped = run.get("skipped_feeds", {})
+    out = REPORT_DIR / f"feeds-{run['date']}.json"
+    out.write_text(json.dumps({
+        "date": run["date"], "polled": len(run["feeds"]), "skipped": skipped,
+        "feeds": {f: stats.get(f) for f in sorted(set(run["feeds"]) | set(skipped))},
+    }, indent=2))
+    parked = sum(1 for why in skipped.values() if why.startswith("parked"))
+    print(f"Feed schedule: polled {len(run['feeds'])}, skipped {len(skipped)} ({parked} parked); see {out}")
+
+# ---- Daily ingest / weekly report ----
+# --ingest (daily) runs Steps 1-4 and adds the kept items to the item store in
+# data/history.sqlite instead of clustering and reporting, so entries that drop out of short
+# feeds mid-week are still caught. --report (weekly) builds the brief from the store's items of
+# the last lookback_days without any fetching: Steps 5-9 and 11 on the stored scores. The
+# committed store holds no article text; it is read back from the article cache (data/cache),
+# falling back to the summary if the cache lost it.
+def stage_ingest(run):
+    # Step 5 (ingest): Store kept items
+    print(">>> Step 5: Adding kept items to the item store")
+    kept = run["kept"]
+    for it in kept:
+        it.setdefault("key", canonical_url(it["url"]))
+    new = history().add_items([{k: v for k, v in it.items() if k != "text"} for it in kept], run["date"])
+    keep_days = cfg().get("item_store", {}).get("keep_days", 28)
+    dropped = history().prune_items((datetime.utcnow().date() - timedelta(days=keep_days)).isoformat())
+    print(f"Item store: {new} new of {len(kept)} kept today, {dropped} older than {keep_days} days dropped")
+    print(">>> Step 6: Discovery from kept links")
+    new_feeds = discover_from_kept(kept, set(run["feeds"]) | set(run.get("skipped_feeds", {})))
+    print(f"New feeds queued: {len(new_feeds)}")
+    save_state()
+    write_feed_report(run)
+    print(f"HTTP client: {net.summary()}")
+
+def stored_text(it):
+    """Text of a stored item as extract_item gave it: the cached article, else its summary"""
+    cached = None if it.get("summary_only") else articles().get(it["key"])
+    text = cached["text"] if cached else ""
+    return text if len(text) >= 400 else normalize_text(it.get("summary", ""))
+
+def stage_load(run):
+    # Steps 1-4 (report): Kept items from the item store
+    days = cfg()["lookback_days"]
+    since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    print(f">>> Steps 1-4: Loading items kept since {since} from the item store")
+    items = [it for it in history().items_since(since)
+             if is_recent(it.get("published"), days=days, tzname=cfg()["timezone"])]
+    for it in items:
+        it["text"] = stored_text(it)
+    # scores are from ingest time, so a raised keep_threshold still applies
+    kept = [it for it in items if it["score"] >= keep_threshold()]
+    if cfg().get("near_duplicates", {}).get("enabled", True):
+        # copies kept on different days
+        kept = group_near_duplicates(kept, near_duplicates(), article_text)
+    print(f"Item store: {len(items)} items from the last {days} days, {len(kept)} go on to clustering")
+    run["kept"] = kept
+
+# (name, function, run keys it produces). Every stage but the last is checkpointed.
+STAGES = [
+    ("feeds", stage_feeds, ("feeds", "skipped_feeds")),
+    ("collect", stage_collect, ("items",)),
+    ("seen", stage_seen, ("items",)),
+    ("prefilter", stage_prefilter, ("items",)),
+    ("dupes", stage_dupes, ("items",)),
+    ("extract", stage_extract, ("items",)),
+    ("score", stage_score, ("kept",)),
+    ("cluster", stage_cluster, ("kept", "clusters")),
+    ("report", stage_report, ()),
+]
+# Streaming mode replaces collect..score with one stage checkpointed under "stream"
+STREAM_STAGES = [STAGES[0], ("stream", stage_stream, ("items", "kept"))] + STAGES[-2:]
+# Sharded mode runs collect..score in worker processes (SHARD_WORKER_STAGES) and merges them
+SHARD_STAGES = [STAGES[0], ("merge", stage_merge, ("items", "kept"))] + STAGES[-2:]
+SHARD_WORKER_STAGES = [("shard", stage_shard, ("plan", "first_seen", "items", "kept", "journal"))]
+# --ingest swaps a mode's cluster and report stages for this; --report runs REPORT_STAGES
+INGEST_STAGE = ("ingest", stage_ingest, ())
+REPORT_STAGES = [("load", stage_load, ("kept",))] + STAGES[-2:]
+STAGE_NAMES = [name for name, _, _ in STAGES] + ["stream", "merge", "ingest", "load"]
+
+def decision_cutoffs():
+    """[keep_threshold, pre-filter cutoff]: the scores below which the seen index and the
+    pre-filter keep items from extraction"""
+    return [keep_threshold(), prefilter_cutoff()]
+
+def stage_deadline(name, started):
+    """time.monotonic() after which stage name sends no more requests: the earlier of the
+    run's total budget and the stage's own (config.yaml `budget`, minutes), or None"""
+    budget = cfg().get("budget", {})
+    ends = [started + 60 * budget["total_minutes"]] if budget.get("total_minutes") is not None else []
+    if budget.get("stages", {}).get(name) is not None:
+        ends.append(time.monotonic() + 60 * budget["stages"][name])
+    return min(ends, default=None)
+
+def run_pipeline(run_dir, start=0, checkpoint=True, stages=STAGES, profile=False, **state):
+    """Run stages[start:], first restoring earlier stage outputs from run_dir;
+    state seeds the run dict (e.g. the shard a worker handles)"""
+    started = time.monotonic()
+    run = {"date": datetime.utcnow().date().isoformat(), "run_dir": str(run_dir), **state}
+    for name, _, keys in stages[:start]:
+        data = load_checkpoint(run_dir, name)
+        run.update({k: data[k] for k in keys if k in data})
+    if start:
+        # each checkpoint carries the skips up to its stage, so a resumed run still reports them
+        restore_degraded(data.get("degraded", {}))
+        rerun = [name for name, _, _ in stages[start:]]
+        old = data.get("cutoffs")
+        if "score" in rerun and "seen" not in rerun and old and any(a > b + 1e-9 for a, b in zip(old, decision_cutoffs())):
+            raise SystemExit(f"the checkpoints in {run_dir} dropped items under keep_threshold / pre-filter cutoff "
+                             f"{old[0]:.3f} / {old[1]:.3f}; to bring them back under the lower "
+                             "{:.3f} / {:.3f}, rerun with --from-stage seen".format(*decision_cutoffs()))
+    for name, fn, keys in stages[start:]:
+        net.set_deadline(stage_deadline(name, started))
+        with metrics.stage(name, profile_dir=run_dir / "profile" if profile else None) as rec:
+            fn(run)
+            rec["items"] = {k: len(run[k]) for k in keys if k in run}
+        if checkpoint and keys:
+            save_checkpoint(run_dir, name, {**{k: run[k] for k in keys if k in run}, "degraded": degraded(),
+                                            "cutoffs": decision_cutoffs()})
+    net.set_deadline(None)
+    return run
+
+def resume_point(run_dir, stages=STAGES):
+    """Index of the first stage without a checkpoint in run_dir"""
+    for i, (name, _, keys) in enumerate(stages):
+        if keys and not checkpoint_path(run_dir, name).exists():
+            return i
+    return len(stages) - 1
+
+# ---- MAIN ----
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="FMS intent tracker weekly pipeline")
+    ap.add_argument("--resume", action="store_true",
+                    help="skip stages already checkpointed in the run directory")
+    ap.add_argument("--from-stage", choices=STAGE_NAMES,
+                    help="rerun from this stage using earlier checkpoints (e.g. score after a keep_threshold change)")
+    ap.add_argument("--run-dir", type=Path,
+                    help="checkpoint directory (default data/runs/<today>)")
+    ap.add_argument("--no-checkpoint", action="store_true", help="do not write stage checkpoints")
+    ap.add_argument("--to-stage", choices=STAGE_NAMES, help="stop after this stage")
+    ap.add_argument("--stream", action="store_true",
+                    help="overlap collection, extraction and scoring through bounded queues")
+    ap.add_argument("--shards", type=int, metavar="N",
+                    help="run collection, extraction and scoring as N worker processes, then merge")
+    ap.add_argument("--shard", metavar="I/N",
+                    help="run collection, extraction and scoring for shard I of N only (see --shards)")
+    daily = ap.add_mutually_exclusive_group()
+    daily.add_argument("--ingest", action="store_true",
+                       help="daily run: collect, extract and score, then add kept items to the item store")
+    daily.add_argument("--report", action="store_true",
+                       help="weekly run: build the report from the item store's last lookback_days, without fetching")
+    ap.add_argument("--profile", action="store_true",
+                    help="dump cProfile and tracemalloc snapshots per stage into <run-dir>/profile")
+    ap.add_argument("--backend", choices=list(BACKENDS),
+                    help="embedding backend for this run (overrides embedding.backend in config.yaml)")
+    ap.add_argument("--budget", type=float, metavar="MINUTES",
+                    help="wall-clock budget for the run's network work (overrides budget.total_minutes)")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    print(">>> Entered main()")
+    args = parse_args(argv)
+    if args.backend:
+        cfg().setdefault("embedding", {})["backend"] = args.backend
+    if args.budget is not None:
+        cfg().setdefault("budget", {})["total_minutes"] = args.budget
+    run_dir = args.run_dir or RUNS_DIR / datetime.utcnow().date().isoformat()
+    if args.shard:
+        i, n = (int(x) for x in args.shard.split("/"))
+        if not 0 <= i < n:
+            raise SystemExit(f"--shard {args.shard}: I must be between 0 and N-1")
+        run_shard(run_dir, i, n, profile=args.profile)
+        return
+    state, mode = {}, "batch"
+    if args.report:
+        stages, mode = REPORT_STAGES, "report"
+    elif args.shards:
+        stages, mode, state = SHARD_STAGES, "sharded", {"shards": args.shards}
+    elif args.stream or cfg().get("stream", {}).get("enabled", False):
+        stages, mode = STREAM_STAGES, "stream"
+    else:
+        stages = STAGES
+    if args.ingest:
+        stages, mode = stages[:-2] + [INGEST_STAGE], f"{mode}-ingest"
+    names = [name for name, _, _ in stages]
+    if args.to_stage:
+        if args.to_stage not in names:
+            raise SystemExit(f"--to-stage {args.to_stage} is not a stage of this mode: {', '.join(names)}")
+        stages = stages[:names.index(args.to_stage) + 1]
+    start = 0
+    if args.from_stage:
+        if args.from_stage not in names:
+            raise SystemExit(f"--from-stage {args.from_stage} is not a stage of this mode: {', '.join(names)}")
+        start = names.index(args.from_stage)
+    elif args.resume:
+        start = resume_point(run_dir, stages)
+    if start:
+        print(f">>> Resuming {run_dir} at stage '{names[start]}'")
+        for name in names[start:]:
+            checkpoint_path(run_dir, name).unlink(missing_ok=True)
+    elif "merge" in names:
+        shutil.rmtree(run_dir / "shards", ignore_errors=True)   # outputs of an earlier run today
+    run = run_pipeline(run_dir, start=start, checkpoint=not args.no_checkpoint, stages=stages,
+                       profile=args.profile, **state)
+    out = REPORT_DIR / (f"metrics-{run['date']}-ingest.json" if args.ingest else f"metrics-{run['date']}.json")
+    extra = {"shards": run["shard_metrics"]} if "shard_metrics" in run else {}
+    data = metrics.write(out, date=run["date"], mode=mode, started_at=names[start], degraded=degraded(),
+                         conditional_get=http_counts(), **extra)
+    print(f">>> Run metrics ({out})")
+    for line in metrics.summary(data):
+        print(f"  {line}")
+    prune_runs(cfg().get("runs", {}).get("keep", 4))
+
 if __name__ == "__main__":
     print(">>> __main__ guard hit")
     main()
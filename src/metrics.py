@@ -0,0 +1,128 @@
+import cProfile, functools, json, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from src import net
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as null
+    resource = None
+
+# ---- Run metrics ----
+# stage() times each pipeline stage (wall time, items out, HTTP requests/wire bytes, peak RSS) and
+# @timed counts calls, items and time in the hot helpers. write() dumps both, plus per-host
+# latency percentiles from the shared HTTP client, to reports/metrics-YYYY-MM-DD.json.
+
+STAGES = {}   # stage -> {seconds, items, per_sec, requests, wire_bytes, peak_rss_mb, ...}
+CALLS = {}    # helper -> {calls, errors, items, seconds, max_seconds}
+_LOCK = threading.Lock()
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+def timed(name, items=None):
+    """Record calls and wall time of the decorated helper under name;
+    items(args, result) is how many items one call handled (default 1)"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            ok, n = False, 0
+            try:
+                out = fn(*args, **kwargs)
+                ok, n = True, (items(args, out) if items else 1)
+                return out
+            finally:
+                secs = time.perf_counter() - t0
+                with _LOCK:
+                    c = CALLS.setdefault(name, {"calls": 0, "errors": 0, "items": 0,
+                                                "seconds": 0.0, "max_seconds": 0.0})
+                    c["calls"] += 1
+                    c["errors"] += not ok
+                    c["items"] += n
+                    c["seconds"] += secs
+                    c["max_seconds"] = max(c["max_seconds"], secs)
+        return inner
+    return wrap
+
+@contextmanager
+def stage(name, profile_dir=None):
+    """Time one pipeline stage; yields a dict the caller can add item counts to.
+    With profile_dir, also writes <name>.prof (cProfile, calling thread only) and
+    <name>.tracemalloc (all threads) there."""
+    rec = {}
+    prof = None
+    if profile_dir:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        tracemalloc.start()
+        prof = cProfile.Profile()
+        prof.enable()
+    before = dict(net.STATS)
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        secs = time.perf_counter() - t0
+        if prof:
+            prof.disable()
+            prof.dump_stats(Path(profile_dir) / f"{name}.prof")
+            tracemalloc.take_snapshot().dump(str(Path(profile_dir) / f"{name}.tracemalloc"))
+            rec["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            tracemalloc.stop()
+        counts = rec.get("items", {})
+        rec.update({
+            "seconds": round(secs, 3),
+            "per_sec": round(max(counts.values(), default=0) / secs, 1) if secs else None,
+            "requests": net.STATS["requests"] - before["requests"],
+            "wire_bytes": net.STATS["wire_bytes"] - before["wire_bytes"],
+            "peak_rss_mb": peak_rss_mb(),
+        })
+        with _LOCK:
+            STAGES[name] = rec
+
+def host_latency():
+    """{host: {requests, p50, p90, p99, max}} in seconds from the shared HTTP client"""
+    out = {}
+    for h, secs in net.latencies().items():
+        a = np.asarray(secs)
+        p50, p90, p99 = np.percentile(a, [50, 90, 99])
+        out[h] = {"requests": len(a), "p50": round(float(p50), 3), "p90": round(float(p90), 3),
+                  "p99": round(float(p99), 3), "max": round(float(a.max()), 3)}
+    return out
+
+def snapshot(**extra):
+    with _LOCK:
+        stages = {k: dict(v) for k, v in STAGES.items()}
+        helpers = {k: {**v, "seconds": round(v["seconds"], 3), "max_seconds": round(v["max_seconds"], 3)}
+                   for k, v in CALLS.items()}
+    return {**extra, "seconds": round(sum(s["seconds"] for s in stages.values()), 3),
+            "peak_rss_mb": peak_rss_mb(), "stages": stages, "helpers": helpers,
+            "http": net.stats(), "hosts": host_latency()}
+
+def write(path, **extra):
+    data = snapshot(**extra)
+    Path(path).write_text(json.dumps(data, indent=2))
+    return data
+
+def summary(data, slowest_hosts=5):
+    """Human-readable lines for the end of the run"""
+    lines = [f"{'stage':<10} {'secs':>8} {'items':>7} {'/s':>8} {'MB wire':>7} {'RSS MB':>7}"]
+    for name, s in data["stages"].items():
+        n = max(s.get("items", {}).values(), default=0)
+        lines.append(f"{name:<10} {s['seconds']:>8.1f} {n:>7} {s['per_sec'] or 0:>8.1f} "
+                     f"{s['wire_bytes'] / 1024 / 1024:>7.1f} {s['peak_rss_mb'] or 0:>7.0f}")
+    for name, c in sorted(data["helpers"].items(), key=lambda kv: -kv[1]["seconds"]):
+        lines.append(f"  {name}: {c['calls']} calls, {c['items']} items, {c['seconds']:.1f}s "
+                     f"(max {c['max_seconds']:.2f}s, {c['errors']} errors)")
+    hosts = sorted(data["hosts"].items(), key=lambda kv: -kv[1]["p90"])[:slowest_hosts]
+    for h, l in hosts:
+        lines.append(f"  slow host {h}: p50 {l['p50']:.2f}s, p90 {l['p90']:.2f}s over {l['requests']} requests")
+    return lines
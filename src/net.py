@@ -0,0 +1,258 @@
+import threading, time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---- Shared pooled HTTP client ----
+# Every fetch path (feeds, pages, articles, discovery) goes through one requests.Session so
+# keep-alive connections to a host are reused across stages and threads. The same choke point
+# enforces the run's time budget (set_deadline) and a circuit breaker per host: after
+# breaker_failures timeouts, connection errors or 5xx answers in a row the host gets no more
+# requests for breaker_cooldown seconds, then one probe decides whether it opens again.
+# Requests not sent raise Skipped, so callers can fall back instead of waiting. While a
+# deadline is set, get() retries itself instead of leaving it to urllib3, so no retry or
+# backoff runs past the deadline and every failed attempt counts towards the breaker.
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes br responses when it is installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+SETTINGS = {
+    "user_agent": "Mozilla/5.0 (FMS-Intent-Tracker)",
+    "connect_timeout": 6,
+    "read_timeout": 12,
+    "pool_hosts": 128,
+    "pool_per_host": 4,
+    "retries": 2,
+    "backoff": 0.5,
+    "breaker_failures": 5,
+    "breaker_cooldown": 600,
+}
+
+STATS = {"requests": 0, "errors": 0, "wire_bytes": 0, "skipped_budget": 0, "skipped_breaker": 0}
+LATENCY = {}  # host -> [seconds per completed request]
+BREAKERS = {}  # host -> {"failures": in a row, "opened": monotonic time it tripped or None, "trips": n}
+_DEADLINE = None
+_STATS_LOCK = threading.Lock()
+
+class Skipped(requests.RequestException):
+    """Request not sent: the time budget is spent or the host's circuit breaker is open"""
+
+class BudgetExhausted(Skipped):
+    pass
+
+class HostUnavailable(Skipped):
+    pass
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_SESSIONS = {}  # retries (bool) -> requests.Session
+_SESSION_LOCK = threading.Lock()
+
+def configure(**settings):
+    """Override SETTINGS (e.g. from config.yaml `http:`); rebuilds the session on next use"""
+    SETTINGS.update({k: v for k, v in settings.items() if v is not None})
+    with _SESSION_LOCK:
+        _SESSIONS.clear()
+
+def session(retries=True):
+    """The shared session; retries=False: one without urllib3 retries (get() under a deadline)"""
+    with _SESSION_LOCK:
+        if retries not in _SESSIONS:
+            n = SETTINGS["retries"] if retries else 0
+            retry = Retry(total=n, connect=n, read=n,
+                          backoff_factor=SETTINGS["backoff"], status_forcelist=RETRY_STATUS,
+                          allowed_methods=("GET", "HEAD"), respect_retry_after_header=True,
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=SETTINGS["pool_hosts"],
+                                  pool_maxsize=SETTINGS["pool_per_host"], max_retries=retry)
+            s = requests.Session()
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update({"User-Agent": SETTINGS["user_agent"], "Accept-Encoding": ACCEPT_ENCODING})
+            _SESSIONS[retries] = s
+        return _SESSIONS[retries]
+
+def set_deadline(deadline):
+    """Send no requests after this time.monotonic() value (None: no limit)"""
+    global _DEADLINE
+    _DEADLINE = deadline
+
+def time_left():
+    """Seconds until the deadline, or None without one"""
+    return None if _DEADLINE is None else _DEADLINE - time.monotonic()
+
+def _admit(h):
+    """Raise HostUnavailable while h's breaker is open; after the cooldown one probe goes through"""
+    with _STATS_LOCK:
+        b = BREAKERS.get(h)
+        if not b or b["opened"] is None:
+            return
+        if time.monotonic() - b["opened"] < SETTINGS["breaker_cooldown"]:
+            STATS["skipped_breaker"] += 1
+            raise HostUnavailable(f"circuit open for {h} after {b['failures']} failures")
+        b["opened"] = time.monotonic()  # half-open: hold others back until the probe returns
+
+def _outcome(h, failed):
+    with _STATS_LOCK:
+        b = BREAKERS.setdefault(h, {"failures": 0, "opened": None, "trips": 0})
+        if not failed:
+            b["failures"], b["opened"] = 0, None
+            return
+        b["failures"] += 1
+        if b["failures"] >= SETTINGS["breaker_failures"]:
+            b["trips"] += b["opened"] is None
+            b["opened"] = time.monotonic()
+
+def _is_open(h):
+    with _STATS_LOCK:
+        return BREAKERS.get(h, {}).get("opened") is not None
+
+def get(url, timeout=None, headers=None):
+    """GET through the shared session; timeout is the read timeout in seconds, cut to the
+    time left before the deadline. Under a deadline, retries (with backoff) only while time
+    is left and the host's breaker stays closed."""
+    h = host(url)
+    _admit(h)
+    left = time_left()
+    if left is not None and left <= 0:
+        with _STATS_LOCK:
+            STATS["skipped_budget"] += 1
+        raise BudgetExhausted(f"time budget spent before {url}")
+    if left is None:
+        return _send(h, url, session(), timeout, headers)
+    for attempt in range(SETTINGS["retries"] + 1):
+        last = attempt == SETTINGS["retries"]
+        try:
+            res = _send(h, url, session(retries=False), timeout, headers)
+        except (requests.Timeout, requests.ConnectionError):
+            if last or not _backoff(h, attempt):
+                raise
+            continue
+        if res.status_code not in RETRY_STATUS or last or not _backoff(h, attempt):
+            return res
+
+def _backoff(h, attempt):
+    """Sleep before retry attempt + 1; False if the breaker opened or no time is left after it"""
+    if _is_open(h):
+        return False
+    delay = SETTINGS["backoff"] * 2 ** attempt
+    if time_left() <= delay:
+        return False
+    time.sleep(delay)
+    return True
+
+def _send(h, url, s, timeout, headers):
+    """One request (plus urllib3's retries, if s has them), counted in STATS and the breaker"""
+    read = timeout or SETTINGS["read_timeout"]
+    left = time_left()
+    if left is not None:
+        read = max(0.001, min(read, left))
+    t0 = time.perf_counter()
+    try:
+        res = s.get(url, headers=headers, timeout=(min(SETTINGS["connect_timeout"], read), read),
+                    allow_redirects=True, hooks={"response": _count_wire})
+    except Exception as e:
+        with _STATS_LOCK:
+            STATS["requests"] += 1
+            STATS["errors"] += 1
+        _outcome(h, isinstance(e, (requests.Timeout, requests.ConnectionError)))
+        raise
+    with _STATS_LOCK:
+        STATS["requests"] += 1
+        STATS["wire_bytes"] += sum(wire_size(r) for r in res.history + [res])
+        LATENCY.setdefault(h, []).append(time.perf_counter() - t0)
+    _outcome(h, res.status_code >= 500)
+    return res
+
+class _Counted:
+    """Connection file wrapper counting the bytes read through it"""
+    def __init__(self, fp):
+        self.fp, self.n = fp, 0
+
+    def _count(self, data):
+        self.n += len(data)
+        return data
+
+    def read(self, *args):
+        return self._count(self.fp.read(*args))
+
+    def read1(self, *args):
+        return self._count(self.fp.read1(*args))
+
+    def readline(self, *args):
+        return self._count(self.fp.readline(*args))
+
+    def readinto(self, b):
+        n = self.fp.readinto(b)
+        self.n += n or 0
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self.fp, name)
+
+def _count_wire(res, *args, **kwargs):
+    """Response hook (every redirect hop too): count the body as it comes off the connection,
+    before any chunked/gzip/br decoding; urllib3's tell() misses chunked bodies"""
+    fp = getattr(getattr(res.raw, "_fp", None), "fp", None)
+    if fp is not None:
+        res.raw._fp.fp = res._wire = _Counted(fp)
+    return res
+
+def wire_size(res):
+    """Body bytes as transferred (chunk framing included, before gzip/br decoding); without a
+    count, urllib3's tell(), then Content-Length, then the decoded size"""
+    body = res.content  # read the body so it has been counted
+    counted = getattr(res, "_wire", None)
+    if counted is not None and counted.n:
+        return counted.n
+    try:
+        n = int(res.raw.tell())
+    except Exception:
+        n = 0
+    return n or int(res.headers.get("Content-Length") or 0) or len(body or b"")
+
+def host(url):
+    return (urlparse(url).netloc or url).lower()
+
+def stats():
+    """Request/byte counters plus connections opened vs reused across all host pools"""
+    opened = served = 0
+    with _SESSION_LOCK:
+        sessions = list(_SESSIONS.values())
+    for s in sessions:
+        for adapter in set(s.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    served += pool.num_requests
+    with _STATS_LOCK:
+        out = dict(STATS)
+    out.update({"connections": opened, "reused": max(0, served - opened)})
+    return out
+
+def tripped():
+    """Hosts whose circuit breaker opened during this run"""
+    with _STATS_LOCK:
+        return sorted(h for h, b in BREAKERS.items() if b["trips"])
+
+def latencies():
+    """Copy of the per-host request latencies recorded so far"""
+    with _STATS_LOCK:
+        return {h: list(v) for h, v in LATENCY.items()}
+
+def summary():
+    st = stats()
+    out = (f"{st['requests']} requests ({st['errors']} errors), {st['wire_bytes'] / 1024 / 1024:.1f} MB transferred, "
+           f"{st['connections']} connections opened, {st['reused']} reused")
+    if st["skipped_budget"]:
+        out += f"; {st['skipped_budget']} skipped past the time budget"
+    if st["skipped_breaker"]:
+        out += f"; {st['skipped_breaker']} skipped to {len(tripped())} hosts with an open circuit"
+    return out
@@ -0,0 +1,21 @@
+from src.dedupe import NearDuplicates
+
+BLURB = ("Weekly analysis of contractor compliance, payroll platforms and the gig economy from our "
+         "newsroom. Subscribe to the newsletter for IR35 updates, employer of record reviews and "
+         "interviews with founders building remote hiring tools across Europe and North America. ") * 4
+TITLES = ["Deel raises a new funding round", "HMRC publishes updated IR35 guidance",
+          "Upwork cuts fees for enterprise clients", "Fiverr launches a freelancer pension scheme"]
+
+
+def test_same_feed_boilerplate_is_not_grouped():
+    nd = NearDuplicates(max_distance=5)
+    reps = [nd.add(f"{t}. {BLURB}", t, "https://news.example/feed") for t in TITLES]
+    assert reps == [None] * len(TITLES)
+    assert nd.groups == len(TITLES)
+
+
+def test_copy_from_another_feed_is_grouped():
+    nd = NearDuplicates(max_distance=5)
+    text = f"{TITLES[0]}. {BLURB}"
+    assert nd.add(text, "first", "https://news.example/feed") is None
+    assert nd.add(f"{text} Read more.", "copy", "https://other.example/rss") == "first"